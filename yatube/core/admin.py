@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "name",
+        "status",
+        "priority",
+        "run_at",
+        "attempts",
+    )
+    list_filter = ("status", "name")
+    search_fields = ("key", "last_error")
+
+
+admin.site.register(Task, TaskAdmin)
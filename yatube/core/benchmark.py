@@ -0,0 +1,88 @@
+"""Замеры страниц и сравнение с сохранённым базовым уровнем.
+
+measure() вызывает функцию запроса несколько раз и собирает перцентили
+задержки, число SQL-запросов и пик выделенной памяти; find_regressions()
+сравнивает эти замеры с прошлыми, сохранёнными в JSON.
+"""
+import time
+import tracemalloc
+
+from django.db import transaction
+
+from .query_budget import count_queries
+
+# Разница меньше этой считается шумом даже при большом относительном росте
+NOISE_MS = 1.0
+
+
+def percentile(values, q):
+    """Перцентиль q (0–100) по ближайшему рангу."""
+    values = sorted(values)
+    if not values:
+        return 0
+    index = max(int(round(q / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def _call(fetch, rollback):
+    if not rollback:
+        return fetch()
+    # Изменения представлений, которые пишут в БД, не накапливаются
+    with transaction.atomic():
+        response = fetch()
+        transaction.set_rollback(True)
+    return response
+
+
+def measure(fetch, iterations, warmup=1, rollback=False):
+    """Замеры fetch(): задержка в мс, число запросов, память в КБ."""
+    for _ in range(warmup):
+        _call(fetch, rollback)
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        with count_queries() as counter:
+            start = time.perf_counter()
+            response = _call(fetch, rollback)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+    # tracemalloc замедляет код, поэтому память меряется отдельным вызовом
+    tracemalloc.start()
+    try:
+        _call(fetch, rollback)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "status": response.status_code,
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+        "p99": percentile(timings, 99),
+        "max": max(timings),
+        "queries": max(queries),
+        "memory_kb": peak / 1024,
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """Описания ухудшений относительно baseline (словари по маршрутам)."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: запросов {before['queries']} → {result['queries']}"
+            )
+        for metric in ("p95", "memory_kb"):
+            limit = before[metric] * (1 + tolerance)
+            noise = NOISE_MS if metric == "p95" else 0
+            if result[metric] > limit and (
+                result[metric] - before[metric] > noise
+            ):
+                regressions.append(
+                    f"{name}: {metric} {before[metric]:.1f} → "
+                    f"{result[metric]:.1f}"
+                )
+    return regressions
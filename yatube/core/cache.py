@@ -0,0 +1,341 @@
+"""Кэш в файле SQLite, общий для всех процессов одного хоста.
+
+LocMemCache живёт внутри процесса: у каждого воркера gunicorn свой кэш,
+а cache.clear() и смена поколений (core.generations) не видны соседям.
+Этот бэкенд хранит записи в одном файле SQLite в режиме WAL: читатели
+не блокируют писателя, а запись идёт под блокировкой БД, поэтому add()
+и incr() атомарны между процессами.
+
+Размер ограничивается числом записей (MAX_ENTRIES) и суммарным объёмом
+значений в байтах (MAX_SIZE). При переполнении сначала удаляются
+просроченные записи, затем давно не читавшиеся (LRU). Целые числа
+хранятся как INTEGER, остальные значения — как pickle.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache.SQLiteCache",
+            "LOCATION": "/var/tmp/yatube-cache.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 50000, "MAX_SIZE": 256 * 2 ** 20},
+        }
+    }
+"""
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .instrumentation import record, timed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET entries = entries - 1, size = size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_stats SET size = size - OLD.size + NEW.size;
+END;
+"""
+
+UPSERT = (
+    "INSERT INTO cache (key, value, expires, accessed, size) "
+    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+    "value = excluded.value, expires = excluded.expires, "
+    "accessed = excluded.accessed, size = excluded.size"
+)
+
+# Время последнего чтения обновляется не чаще раза в секунду: иначе
+# каждое попадание в кэш превращалось бы в запись в БД.
+ACCESS_RESOLUTION = 1.0
+
+# Ограничение SQLite на число параметров в одном запросе
+CHUNK_SIZE = 500
+
+INT_SIZE = 8
+MIN_INT = -(2 ** 63)
+MAX_INT = 2 ** 63 - 1
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), CHUNK_SIZE):
+        end = start + CHUNK_SIZE
+        yield items[start:end]
+
+
+def _placeholders(items):
+    return ", ".join("?" * len(items))
+
+
+def _timed(method):
+    """Учитывает время обращения к кэшу в метриках запроса."""
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with timed("cache"):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = location
+        self._max_size = int(options.get("MAX_SIZE", 0))
+        self._busy_timeout = float(options.get("BUSY_TIMEOUT", 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение своё у каждого потока и не переживает fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self._path, timeout=self._busy_timeout, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self, conn=None):
+        """Пишущая транзакция: блокировка берётся сразу, а не при записи."""
+        conn = conn or self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _encode(self, value):
+        if type(value) is int and MIN_INT <= value <= MAX_INT:
+            return value, INT_SIZE
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return data, len(data)
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _is_expired(self, expires, now):
+        return expires is not None and expires <= now
+
+    @_timed
+    def _fetch(self, keys):
+        conn = self._connection()
+        now = time.time()
+        found, expired, stale = {}, [], []
+        for chunk in _chunks(keys):
+            rows = conn.execute(
+                "SELECT key, value, expires, accessed FROM cache "
+                f"WHERE key IN ({_placeholders(chunk)})",
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if self._is_expired(expires, now):
+                    expired.append(key)
+                    continue
+                found[key] = self._decode(value)
+                if accessed < now - ACCESS_RESOLUTION:
+                    stale.append(key)
+        if expired or stale:
+            with self._transaction(conn):
+                for chunk in _chunks(expired):
+                    conn.execute(
+                        "DELETE FROM cache "
+                        f"WHERE key IN ({_placeholders(chunk)}) "
+                        "AND expires <= ?",
+                        chunk + [now],
+                    )
+                for chunk in _chunks(stale):
+                    conn.execute(
+                        "UPDATE cache SET accessed = ? "
+                        f"WHERE key IN ({_placeholders(chunk)})",
+                        [now] + chunk,
+                    )
+        record("cache_hit", count=len(found))
+        record("cache_miss", count=len(keys) - len(found))
+        return found
+
+    def _store(self, conn, items, timeout):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = []
+        for key, value in items.items():
+            value, size = self._encode(value)
+            rows.append((key, value, expires, now, size))
+        conn.executemany(UPSERT, rows)
+
+    def _stats(self, conn):
+        return conn.execute("SELECT entries, size FROM cache_stats").fetchone()
+
+    def _cull(self, conn):
+        """Удаляет просроченные, затем самые давно читавшиеся записи."""
+        entries, size = self._stats(conn)
+        if not self._is_full(entries, size):
+            return
+        conn.execute("DELETE FROM cache WHERE expires <= ?", [time.time()])
+        entries, size = self._stats(conn)
+        if self._cull_frequency == 0:
+            if self._is_full(entries, size):
+                conn.execute("DELETE FROM cache")
+            return
+        while entries and self._is_full(entries, size):
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                [max(entries // self._cull_frequency, 1)],
+            )
+            entries, size = self._stats(conn)
+
+    def _is_full(self, entries, size):
+        return entries > self._max_entries or (
+            self._max_size and size > self._max_size
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {}
+        for key in keys:
+            cache_key = self.make_key(key, version=version)
+            self.validate_key(cache_key)
+            key_map[cache_key] = key
+        found = self._fetch(key_map)
+        return {key_map[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    @_timed
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = {}
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            items[key] = value
+        with self._transaction() as conn:
+            self._store(conn, items, timeout)
+            self._cull(conn)
+        return []
+
+    @_timed
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        encoded, size = self._encode(value)
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", [key, now]
+            )
+            added = conn.execute(
+                "INSERT OR IGNORE INTO cache "
+                "(key, value, expires, accessed, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [key, encoded, self.get_backend_timeout(timeout), now, size],
+            ).rowcount
+            if added:
+                self._cull(conn)
+        return bool(added)
+
+    @_timed
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", [key]
+            ).fetchone()
+            if row is None or self._is_expired(row[1], time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            encoded, size = self._encode(value)
+            conn.execute(
+                "UPDATE cache SET value = ?, size = ?, accessed = ? "
+                "WHERE key = ?",
+                [encoded, size, time.time(), key],
+            )
+        return value
+
+    @_timed
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._transaction() as conn:
+            touched = conn.execute(
+                "UPDATE cache SET expires = ? "
+                "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                [self.get_backend_timeout(timeout), key, time.time()],
+            ).rowcount
+        return bool(touched)
+
+    @_timed
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = (
+            self._connection()
+            .execute(
+                "SELECT 1 FROM cache "
+                "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                [key, time.time()],
+            )
+            .fetchone()
+        )
+        return row is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    @_timed
+    def delete_many(self, keys, version=None):
+        cache_keys = []
+        for key in keys:
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            cache_keys.append(key)
+        with self._transaction() as conn:
+            for chunk in _chunks(cache_keys):
+                conn.execute(
+                    f"DELETE FROM cache WHERE key IN ({_placeholders(chunk)})",
+                    chunk,
+                )
+
+    @_timed
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM cache")
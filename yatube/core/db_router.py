@@ -0,0 +1,99 @@
+"""Чтение с реплик и запись в основную базу.
+
+Представления, отмеченные декоратором @replica_reads (у функции) или
+атрибутом replica_reads = True (у класса), читают с одной из баз
+DATABASE_REPLICAS; все записи и остальные чтения идут в default.
+
+Реплики отстают от основной базы, поэтому ReplicaMiddleware после любой
+записи закрепляет клиента за основной базой на REPLICA_LAG_SECONDS:
+свой новый пост, комментарий или подписку пользователь видит сразу.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = ContextVar("replica_state", default=None)
+
+# Сессии читаются с основной базы: только что созданной сессии на
+# реплике ещё нет
+PRIMARY_ONLY_APPS = {"sessions"}
+
+
+class ReplicaState:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+        self.alias = None
+
+
+def get_replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def lag_seconds():
+    return getattr(settings, "REPLICA_LAG_SECONDS", 10)
+
+
+@contextmanager
+def routing(use_replica):
+    """Маршрутизация запросов к БД внутри блока with."""
+    state = ReplicaState(use_replica)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def reads_from_replica():
+    """Читает ли текущий запрос с реплики."""
+    state = _state.get()
+    return bool(
+        state is not None
+        and state.use_replica
+        and not state.wrote
+        and get_replicas()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+def replica_reads(view_func):
+    """Разрешает функции-представлению читать с реплик."""
+    view_func.replica_reads = True
+    return view_func
+
+
+def wants_replica(view_func):
+    if getattr(view_func, "replica_reads", False):
+        return True
+    view_class = getattr(view_func, "view_class", None)
+    return getattr(view_class, "replica_reads", False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        if not reads_from_replica():
+            return None
+        state = _state.get()
+        # Все чтения запроса идут с одной реплики: так данные согласованы
+        if state.alias is None:
+            state.alias = random.choice(get_replicas())
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики — копии основной базы, их схему не мигрируют
+        return db not in get_replicas()
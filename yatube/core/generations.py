@@ -0,0 +1,55 @@
+"""Поколения кэша для мгновенной инвалидации.
+
+Каждая область (например, «все посты» или «посты группы 5») хранит в
+кэше случайный токен поколения. Ключи кэшируемых фрагментов включают
+токены своих областей, поэтому bump() делает все такие фрагменты
+недостижимыми сразу, а сами фрагменты можно хранить часами.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = "generation:"
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def get_generations(*scopes):
+    """Токены поколений областей в порядке перечисления."""
+    keys = [KEY_PREFIX + scope for scope in scopes]
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            # Поколение вытеснено или ещё не создано: начинаем новое.
+            # Если его одновременно создал другой процесс, берём его токен.
+            token = _new_token()
+            if not cache.add(key, token, None):
+                token = cache.get(key, token)
+            tokens[key] = token
+    return [tokens[key] for key in keys]
+
+
+def get_version(*scopes):
+    """Единая строка версии для фрагмента, зависящего от областей."""
+    return "-".join(get_generations(*scopes))
+
+
+def _bump(scopes):
+    cache.set_many(
+        {KEY_PREFIX + scope: _new_token() for scope in scopes}, None
+    )
+
+
+def bump(*scopes):
+    """Начинает новое поколение областей.
+
+    Внутри транзакции поколение сменяется ещё раз после фиксации: иначе
+    параллельный запрос мог бы закэшировать данные, прочитанные до
+    коммита, уже под новым поколением.
+    """
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
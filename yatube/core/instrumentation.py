@@ -0,0 +1,77 @@
+"""Метрики производительности текущего запроса.
+
+ServerTimingMiddleware открывает сбор метрик для выбранного запроса, а
+измеряемые места (бэкенд кэша, шаблонизатор, бэкенд миниатюр) вызывают
+record() и timed(). Вне выбранного запроса они ничего не делают, поэтому
+инструментирование можно не отключать в продакшене.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates, Template
+
+_metrics = ContextVar("request_metrics", default=None)
+
+
+class Metrics:
+    """Счётчики и суммарная длительность в мс по имени метрики."""
+
+    def __init__(self):
+        self.counts = {}
+        self.durations = {}
+
+    def add(self, name, duration=0.0, count=1):
+        self.counts[name] = self.counts.get(name, 0) + count
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+
+
+@contextmanager
+def collect():
+    """Собирает метрики кода внутри блока with."""
+    metrics = Metrics()
+    token = _metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _metrics.reset(token)
+
+
+def is_active():
+    return _metrics.get() is not None
+
+
+def record(name, duration=0.0, count=1):
+    metrics = _metrics.get()
+    if metrics is not None:
+        metrics.add(name, duration, count)
+
+
+@contextmanager
+def timed(name):
+    """Добавляет длительность блока к метрике name."""
+    if _metrics.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, замеряющий время отрисовки шаблонов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
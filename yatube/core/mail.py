@@ -0,0 +1,36 @@
+"""Отправка почты через очередь задач.
+
+QueuedEmailBackend ничего не отправляет в запросе: письмо сериализуется
+в задачу, а воркер run_tasks передаёт его настоящему бэкенду
+TASKS_EMAIL_BACKEND. Сбой почтового сервера не роняет сброс пароля,
+а письмо уходит повторной попыткой.
+"""
+import base64
+import pickle
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+DEFAULT_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+
+
+@task(priority=10, max_attempts=5, retry_delay=60)
+def send_email(data):
+    """Отправляет письмо, сериализованное QueuedEmailBackend."""
+    message = pickle.loads(base64.b64decode(data))
+    backend = getattr(settings, "TASKS_EMAIL_BACKEND", DEFAULT_BACKEND)
+    with get_connection(backend) as connection:
+        connection.send_messages([message])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            # Соединение бэкенда не сериализуется и воркеру не нужно
+            message.connection = None
+            data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+            send_email.enqueue(base64.b64encode(data).decode())
+        return len(email_messages)
@@ -0,0 +1,109 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "sqlite": "core.cache.SQLiteCache",
+}
+
+COUNTER_KEY = "benchmark:counter"
+
+
+def create_cache(backend, location, max_entries):
+    params = {"TIMEOUT": None, "OPTIONS": {"MAX_ENTRIES": max_entries}}
+    return import_string(BACKENDS[backend])(location, params)
+
+
+def run_worker(backend, location, max_entries, operations, keys, seed):
+    """Смесь чтений, записей и инкрементов, как у страниц сайта.
+
+    Популярность ключей убывает экспоненциально: немногие горячие ключи
+    читаются часто, длинный хвост — редко.
+    """
+    cache = create_cache(backend, location, max_entries)
+    rnd = random.Random(seed)
+    value = "x" * 2048
+    hits = misses = increments = 0
+    start = time.perf_counter()
+    for _ in range(operations):
+        key = f"benchmark:{min(int(rnd.expovariate(10 / keys)), keys - 1)}"
+        roll = rnd.random()
+        if roll < 0.05:
+            try:
+                cache.incr(COUNTER_KEY)
+            except ValueError:
+                cache.add(COUNTER_KEY, 0)
+                cache.incr(COUNTER_KEY)
+            increments += 1
+        elif cache.get(key) is not None:
+            hits += 1
+        else:
+            misses += 1
+            cache.set(key, value)
+    return time.perf_counter() - start, hits, misses, increments
+
+
+class Command(BaseCommand):
+    help = "Сравнивает бэкенды кэша под нагрузкой из нескольких процессов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=sorted(BACKENDS),
+            help="По умолчанию проверяются все бэкенды.",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--operations", type=int, default=20000)
+        parser.add_argument("--keys", type=int, default=2000)
+        parser.add_argument("--max-entries", type=int, default=1000)
+
+    def handle(self, *args, backend, workers, operations, keys, **options):
+        directory = tempfile.mkdtemp(prefix="cache-benchmark-")
+        try:
+            for name in backend or sorted(BACKENDS):
+                location = os.path.join(directory, name)
+                if name == "sqlite":
+                    location += ".sqlite3"
+                self.run(name, location, workers, operations, keys, options)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, backend, location, workers, operations, keys, options):
+        max_entries = options["max_entries"]
+        create_cache(backend, location, max_entries).clear()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(
+                pool.map(
+                    run_worker,
+                    [backend] * workers,
+                    [location] * workers,
+                    [max_entries] * workers,
+                    [operations] * workers,
+                    [keys] * workers,
+                    range(workers),
+                )
+            )
+        elapsed = time.perf_counter() - start
+        hits = sum(result[1] for result in results)
+        misses = sum(result[2] for result in results)
+        increments = sum(result[3] for result in results)
+        # LocMemCache у каждого процесса свой: счётчик родителю не виден
+        counter = create_cache(backend, location, max_entries).get(
+            COUNTER_KEY
+        )
+        self.stdout.write(
+            f"{backend:>7}: {workers * operations / elapsed:9.0f} оп/с, "
+            f"попаданий {hits / max(hits + misses, 1):6.1%}, "
+            f"счётчик {counter if counter is not None else '—'}"
+            f" из {increments}"
+        )
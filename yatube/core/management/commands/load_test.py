@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import local
+
+import requests
+from django.core.management.base import BaseCommand
+
+from core.benchmark import percentile
+
+DEFAULT_PATHS = ["/", "/group/{group}/", "/profile/{author}/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагружает запущенный сервер параллельными GET-запросами "
+        "и выводит пропускную способность и задержки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "base_url", nargs="?", default="http://127.0.0.1:8000"
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Адрес страницы; по умолчанию главная, группа и профиль.",
+        )
+        parser.add_argument("--group", default="cats")
+        parser.add_argument("--author", default="admin")
+        parser.add_argument(
+            "--concurrency", type=int, nargs="+", default=[1, 8, 32]
+        )
+        parser.add_argument("--requests", type=int, default=500)
+
+    def handle(self, *args, base_url, path, concurrency, **options):
+        urls = [
+            base_url.rstrip("/") + url.format(**options)
+            for url in path or DEFAULT_PATHS
+        ]
+        for clients in concurrency:
+            self.run(urls, clients, options["requests"])
+
+    def run(self, urls, clients, total):
+        sessions = local()
+
+        def fetch(number):
+            session = getattr(sessions, "session", None)
+            if session is None:
+                session = sessions.session = requests.Session()
+            start = time.perf_counter()
+            try:
+                ok = session.get(urls[number % len(urls)]).ok
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - start
+        timings = [timing * 1000 for timing, ok in results if ok]
+        errors = total - len(timings)
+        self.stdout.write(
+            f"{clients:>4} клиентов: {total / elapsed:7.1f} запр/с, "
+            f"p50 {percentile(timings, 50):7.1f} мс, "
+            f"p95 {percentile(timings, 95):7.1f} мс, "
+            f"p99 {percentile(timings, 99):7.1f} мс, ошибок {errors}"
+        )
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import run_pending
+
+
+def work(poll, once):
+    """Цикл воркера: выполняет готовые задачи, в простое спит poll секунд."""
+    done = 0
+    while True:
+        executed = run_pending()
+        done += executed
+        if once:
+            return done
+        if not executed:
+            time.sleep(poll)
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет фоновые задачи из очереди core.tasks в пуле процессов: "
+        "отправку почты, обработку картинок и другие."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "TASKS_WORKERS", 2),
+            help="Число процессов-воркеров.",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Пауза в секундах, когда готовых задач нет.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить готовые задачи и выйти.",
+        )
+
+    def handle(self, *args, workers, poll, once, **options):
+        if workers <= 1:
+            done = work(poll, once)
+        else:
+            # Дочерние процессы не должны наследовать соединения с базой
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(work, poll, once) for _ in range(workers)
+                ]
+                done = sum(future.result() for future in futures)
+        self.stdout.write(f"Задач выполнено: {done}")
@@ -0,0 +1,159 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import percentile
+from core.sqlite import DEFAULT_PRAGMAS, apply_pragmas
+
+# Прежний режим: журнал отката, новое соединение на каждый запрос и
+# таймаут ожидания блокировки модуля sqlite3 (5 с)
+MODES = {
+    "default": {"pragmas": {}, "persistent": False},
+    "tuned": {"pragmas": DEFAULT_PRAGMAS, "persistent": True},
+}
+
+SCHEMA = """
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY, text TEXT, comments_count INTEGER DEFAULT 0
+);
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY, post_id INTEGER, text TEXT, pub_date REAL
+);
+CREATE INDEX comment_post ON comment (post_id, pub_date);
+"""
+
+READ = (
+    "SELECT p.id, p.text, p.comments_count FROM post p "
+    "ORDER BY p.id DESC LIMIT 10"
+)
+READ_COMMENTS = (
+    "SELECT id, text FROM comment WHERE post_id = ? "
+    "ORDER BY pub_date LIMIT 20"
+)
+
+
+def prepare(path, posts):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    connection.executemany(
+        "INSERT INTO post (text) VALUES (?)",
+        ((f"Пост {number} " * 20,) for number in range(posts)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def run_worker(path, mode, role, duration, posts, seed):
+    """Чтения как у страницы поста или записи как у add_comment.
+
+    Возвращает число операций, задержки в мс и число ошибок блокировки.
+    """
+    settings = MODES[mode]
+
+    def connect():
+        connection = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(connection, settings["pragmas"])
+        return connection
+
+    persistent = connect() if settings["persistent"] else None
+    timings = []
+    errors = 0
+    number = seed
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        number += 1
+        post_id = number % posts + 1
+        start = time.perf_counter()
+        connection = persistent or connect()
+        try:
+            if role == "read":
+                connection.execute(READ).fetchall()
+                connection.execute(READ_COMMENTS, (post_id,)).fetchall()
+            else:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT INTO comment (post_id, text, pub_date) "
+                    "VALUES (?, ?, ?)",
+                    (post_id, "Комментарий", time.time()),
+                )
+                connection.execute(
+                    "UPDATE post SET comments_count = comments_count + 1 "
+                    "WHERE id = ?",
+                    (post_id,),
+                )
+                connection.execute("COMMIT")
+            timings.append((time.perf_counter() - start) * 1000)
+        except sqlite3.OperationalError:
+            errors += 1
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+        finally:
+            if persistent is None:
+                connection.close()
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность SQLite при одновременных "
+        "чтениях и записях: режим по умолчанию против SQLITE_PRAGMAS "
+        "с постоянными соединениями."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            action="append",
+            choices=sorted(MODES),
+            help="По умолчанию проверяются все режимы.",
+        )
+        parser.add_argument("--readers", type=int, default=6)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--duration", type=float, default=5)
+        parser.add_argument("--posts", type=int, default=1000)
+
+    def handle(self, *args, mode, **options):
+        directory = tempfile.mkdtemp(prefix="sqlite-benchmark-")
+        try:
+            for name in mode or sorted(MODES):
+                path = os.path.join(directory, f"{name}.sqlite3")
+                prepare(path, options["posts"])
+                self.run(name, path, options)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, mode, path, options):
+        roles = ["read"] * options["readers"] + ["write"] * options["writers"]
+        with ProcessPoolExecutor(len(roles)) as pool:
+            results = list(
+                pool.map(
+                    run_worker,
+                    [path] * len(roles),
+                    [mode] * len(roles),
+                    roles,
+                    [options["duration"]] * len(roles),
+                    [options["posts"]] * len(roles),
+                    range(0, len(roles) * 7919, 7919),
+                )
+            )
+        for role in ("read", "write"):
+            timings = []
+            errors = 0
+            for worker_role, (worker_timings, worker_errors) in zip(
+                roles, results
+            ):
+                if worker_role == role:
+                    timings += worker_timings
+                    errors += worker_errors
+            self.stdout.write(
+                f"{mode:>7} {role:>5}: "
+                f"{len(timings) / options['duration']:8.0f} оп/с, "
+                f"p50 {percentile(timings, 50):6.2f} мс, "
+                f"p99 {percentile(timings, 99):6.2f} мс, "
+                f"ошибок блокировки {errors}"
+            )
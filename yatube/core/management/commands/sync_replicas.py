@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+def copy_database(source, target):
+    """Копирует SQLite-базу source в target онлайн-бэкапом.
+
+    Копия пишется во временный файл и подменяет target атомарно, поэтому
+    читатели видят либо старую, либо новую копию целиком. У копии
+    выключается WAL: иначе рядом остался бы -wal файл от старой копии.
+    """
+    temporary = target + ".tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    primary = sqlite3.connect(source)
+    copy = sqlite3.connect(temporary)
+    try:
+        primary.backup(copy)
+        copy.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        copy.close()
+        primary.close()
+    os.replace(temporary, target)
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную SQLite-базу в файлы реплик DATABASE_REPLICAS: "
+        "локальная замена репликации для проверки чтения с реплик."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Повторять копирование с этим интервалом в секундах.",
+        )
+
+    def handle(self, *args, interval, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replicas = [
+            settings.DATABASES[alias] for alias in settings.DATABASE_REPLICAS
+        ]
+        if not replicas:
+            raise CommandError("Реплики не настроены: задайте DB_REPLICAS")
+        engines = {primary["ENGINE"]} | {db["ENGINE"] for db in replicas}
+        if engines != {"django.db.backends.sqlite3"}:
+            raise CommandError(
+                "Команда копирует только SQLite; для других СУБД "
+                "используйте их собственную репликацию"
+            )
+        while True:
+            start = time.monotonic()
+            for replica in replicas:
+                copy_database(primary["NAME"], replica["NAME"])
+            self.stdout.write(
+                f"Реплик обновлено: {len(replicas)} "
+                f"за {time.monotonic() - start:.2f} с"
+            )
+            if not interval:
+                return
+            time.sleep(interval)
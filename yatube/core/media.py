@@ -0,0 +1,208 @@
+"""Раздача загруженных файлов (MEDIA_ROOT) в продакшене.
+
+django.views.static.serve читает файл в Python целиком и работает только
+при DEBUG. Представление serve() здесь:
+
+* при MEDIA_SENDFILE передаёт отправку файла веб-серверу заголовком
+  X-Sendfile (Apache, lighttpd) или X-Accel-Redirect (nginx);
+* иначе отдаёт FileResponse, который gunicorn отправляет системным
+  вызовом sendfile без копирования в Python;
+* отвечает на Range-запросы (перемотка видео, докачка) кодом 206;
+* ставит сильный ETag по времени изменения и размеру файла и отвечает
+  304 на повторные запросы.
+
+Имена в MEDIA_IMMUTABLE_PREFIXES никогда не переиспользуются: имя
+миниатюры sorl-thumbnail — хэш исходника и параметров. Такие файлы
+кэшируются клиентом на год. Картинки постов (posts/) в их число не
+входят: после нормализации оригинал удаляется, и его имя может занять
+новая загрузка.
+"""
+import mimetypes
+import os
+import re
+import stat
+from http import HTTPStatus
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+SENDFILE = getattr(settings, "MEDIA_SENDFILE", None)
+ACCEL_REDIRECT_PREFIX = getattr(
+    settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/"
+)
+IMMUTABLE_PREFIXES = tuple(
+    getattr(settings, "MEDIA_IMMUTABLE_PREFIXES", ("cache/",))
+)
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MAX_AGE = getattr(settings, "MEDIA_MAX_AGE", 60 * 60)
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """Файл, из которого читается не больше length байт от начала.
+
+    fileno() отдаёт дескриптор исходного файла: gunicorn отправляет
+    sendfile() с текущей позиции ровно Content-Length байт.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Границы (start, end) включительно из заголовка Range.
+
+    None — заголовок не распознан, и отдаётся весь файл; несколько
+    диапазонов тоже отдаются целиком, как разрешает RFC 7233.
+    ValueError — диапазон за пределами файла.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-500 — последние 500 байт
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _etag(stats):
+    return f'"{stats.st_mtime_ns:x}-{stats.st_size:x}"'
+
+
+def _cache_headers(response, path, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    if path.startswith(IMMUTABLE_PREFIXES):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=MAX_AGE)
+    return response
+
+
+def _offload(path, fullpath, content_type):
+    # Заголовки передаются в latin-1: кириллицу в имени файла Django
+    # закодировал бы по RFC 2047, поэтому путь кодируется как в URL
+    response = HttpResponse(content_type=content_type)
+    if SENDFILE == "x-accel-redirect":
+        response["X-Accel-Redirect"] = quote(ACCEL_REDIRECT_PREFIX + path)
+    else:
+        response["X-Sendfile"] = quote(fullpath)
+    return response
+
+
+def _stat(path):
+    """Полный путь и stat обычного файла внутри MEDIA_ROOT, иначе 404."""
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404
+    return fullpath, stats
+
+
+def _content_type(fullpath):
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    # Сжатый файл (.gz) отдаётся как есть: без Content-Encoding браузер не
+    # распакует его, поэтому тип исходного содержимого указывать нельзя
+    if content_type is None or encoding:
+        return "application/octet-stream"
+    return content_type
+
+
+def _requested_range(request, etag, size):
+    """Границы (start, end) для ответа 206 или None — весь файл.
+
+    ValueError — диапазон за пределами файла.
+    """
+    header = request.META.get("HTTP_RANGE")
+    # If-Range с чужим ETag: файл изменился, отдаём его целиком
+    if not header or request.META.get("HTTP_IF_RANGE", etag) != etag:
+        return None
+    return parse_range(header, size)
+
+
+def _file_response(request, fullpath, content_type, size, bounds):
+    status = HTTPStatus.OK
+    start, end = 0, size - 1
+    if bounds is not None:
+        start, end = bounds
+        status = HTTPStatus.PARTIAL_CONTENT
+    length = end - start + 1 if size else 0
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type, status=status)
+    else:
+        file = RangeFile(open(fullpath, "rb"), start, length)
+        response = FileResponse(
+            file, content_type=content_type, status=status
+        )
+    response["Content-Length"] = length
+    if bounds is not None:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
+
+
+@require_safe
+def serve(request, path):
+    fullpath, stats = _stat(path)
+    etag = _etag(stats)
+    last_modified = int(stats.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return _cache_headers(response, path, etag, last_modified)
+    content_type = _content_type(fullpath)
+    if SENDFILE:
+        # Range и If-Range веб-сервер обрабатывает сам
+        response = _offload(path, fullpath, content_type)
+        return _cache_headers(response, path, etag, last_modified)
+    size = stats.st_size
+    try:
+        bounds = _requested_range(request, etag, size)
+    except ValueError:
+        response = HttpResponse(
+            status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        response["Content-Range"] = f"bytes */{size}"
+    else:
+        response = _file_response(
+            request, fullpath, content_type, size, bounds
+        )
+    return _cache_headers(response, path, etag, last_modified)
@@ -0,0 +1,174 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import db_router, instrumentation, page_cache
+from .query_budget import QueryBudgetExceeded, count_queries, get_query_budget
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("core.timing")
+
+
+class QueryBudgetMiddleware:
+    """Сравнивает число запросов с бюджетом представления.
+
+    При QUERY_BUDGET_STRICT превышение бюджета поднимает исключение
+    (так падают тесты), иначе записывается предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+        budget = getattr(request, "query_budget", None)
+        if budget is not None and counter.count > budget:
+            message = (
+                f"{request.resolver_match.view_name}: {counter.count} "
+                f"queries, budget is {budget}"
+            )
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(
+                    message + "\n" + "\n".join(counter.queries)
+                )
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func)
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик для отмеченных представлений.
+
+    После запроса, который что-то записал в БД, клиент получает куку
+    PIN_COOKIE и следующие REPLICA_LAG_SECONDS читает с основной базы.
+    """
+
+    PIN_COOKIE = "db_primary"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with db_router.routing(use_replica=False) as state:
+            request.replica_state = state
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                self.PIN_COOKIE,
+                "1",
+                max_age=db_router.lag_seconds(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        pinned = self.PIN_COOKIE in request.COOKIES
+        request.replica_state.use_replica = (
+            db_router.wants_replica(view_func) and not pinned
+        )
+
+
+class PageCacheMiddleware:
+    """Отдаёт анонимным посетителям страницы из кэша (см. core.page_cache).
+
+    Стоит после AuthenticationMiddleware: пользователь уже известен, а
+    заголовки внешних middleware добавляются и к ответу из кэша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.surrogate_keys = None
+        response = self.get_response(request)
+        if request.surrogate_keys is not None:
+            stored = page_cache.store_response(request, response)
+            response[page_cache.STATUS_HEADER] = "miss" if stored else "skip"
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not page_cache.wants_page_cache(view_func):
+            return None
+        if not page_cache.is_cacheable_request(request):
+            return None
+        response = page_cache.get_cached_response(request)
+        if response is not None:
+            response[page_cache.STATUS_HEADER] = "hit"
+            return response
+        request.surrogate_keys = {}
+        return None
+
+
+class ServerTimingMiddleware:
+    """Метрики запроса в заголовке Server-Timing и в логе core.timing.
+
+    Собираются время и число SQL-запросов, попадания и промахи кэша,
+    время отрисовки шаблонов и получения миниатюр. Метрики снимаются
+    только с доли запросов SERVER_TIMING_SAMPLE_RATE; остальные запросы
+    проходят без замеров. Длительности частично вложены друг в друга:
+    запросы и миниатюры выполняются и во время отрисовки шаблона.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = getattr(settings, "SERVER_TIMING_SAMPLE_RATE", 0)
+        if random.random() >= rate:
+            return self.get_response(request)
+        start = time.perf_counter()
+        with instrumentation.collect() as metrics:
+            with count_queries() as queries:
+                response = self.get_response(request)
+        metrics.add("db", queries.duration * 1000, queries.count)
+        metrics.add("total", (time.perf_counter() - start) * 1000)
+        response["Server-Timing"] = self.header(metrics)
+        match = request.resolver_match
+        timing_logger.info(
+            json.dumps(
+                {
+                    "view": match.view_name if match else None,
+                    "method": request.method,
+                    "status": response.status_code,
+                    **self.summary(metrics),
+                }
+            )
+        )
+        return response
+
+    def summary(self, metrics):
+        counts, durations = metrics.counts, metrics.durations
+        return {
+            "total_ms": round(durations["total"], 1),
+            "db_queries": counts["db"],
+            "db_ms": round(durations["db"], 1),
+            "cache_hits": counts.get("cache_hit", 0),
+            "cache_misses": counts.get("cache_miss", 0),
+            "cache_ms": round(durations.get("cache", 0), 1),
+            "template_ms": round(durations.get("template", 0), 1),
+            "thumbnails": counts.get("thumbnail", 0),
+            "thumbnail_ms": round(durations.get("thumbnail", 0), 1),
+        }
+
+    def header(self, metrics):
+        summary = self.summary(metrics)
+        return ", ".join(
+            [
+                f"total;dur={summary['total_ms']}",
+                f"db;dur={summary['db_ms']};"
+                f'desc="{summary["db_queries"]} queries"',
+                f"cache;dur={summary['cache_ms']};"
+                f'desc="{summary["cache_hits"]} hits, '
+                f'{summary["cache_misses"]} misses"',
+                f"template;dur={summary['template_ms']}",
+                f"thumbnail;dur={summary['thumbnail_ms']};"
+                f'desc="{summary["thumbnails"]} thumbnails"',
+            ]
+        )
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -7,3 +8,52 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, помеченной декоратором core.tasks.task."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "Ожидает"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Ошибка"),
+    )
+
+    # Путь к функции задачи, например posts.tasks.process_image
+    name = models.CharField("Задача", max_length=200)
+    # Аргументы вызова в JSON
+    args = models.TextField(default="[]")
+    kwargs = models.TextField(default="{}")
+    # Ключ дедупликации: в очереди не бывает двух ожидающих задач с ним
+    key = models.CharField(max_length=200, null=True, blank=True)
+    priority = models.SmallIntegerField("Приоритет", default=0)
+    status = models.CharField(
+        "Состояние", max_length=10, choices=STATUSES, default=PENDING
+    )
+    run_at = models.DateTimeField("Выполнить не раньше", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Метка воркера, взявшего задачу, и время, когда он её взял
+    locked_by = models.CharField(max_length=32, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-priority", "run_at", "id"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status="pending"),
+                name="unique_pending_task_key",
+            ),
+        ]
+        verbose_name = "Задача"
+        verbose_name_plural = "Очередь задач"
@@ -0,0 +1,105 @@
+"""Кэш целых страниц для анонимных посетителей.
+
+Представление с атрибутом page_cache = True помечает ответ суррогатными
+ключами — областями core.generations (пост, автор, группа, лента) — через
+add_surrogate_keys(). Вместе с ответом сохраняются токены поколений его
+ключей, и при чтении ответ отдаётся, только если ни одно поколение не
+сменилось. Поэтому bump() области из сигналов сбрасывает ровно те
+страницы, которые её показывают. Ключи отдаются и в заголовке
+Surrogate-Key для CDN, умеющего сбрасывать кэш по ключам.
+
+Кэш не используется для вошедших пользователей, запросов кроме GET и
+HEAD и ответов с куками, CSRF-токеном или Vary: страница должна быть
+одинаковой для всех анонимных посетителей.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .db_router import reads_from_replica
+from .generations import get_generations
+
+KEY_PREFIX = "page:"
+SURROGATE_KEY_HEADER = "Surrogate-Key"
+STATUS_HEADER = "X-Page-Cache"
+
+
+def wants_page_cache(view_func):
+    view_class = getattr(view_func, "view_class", None)
+    return getattr(view_class or view_func, "page_cache", False)
+
+
+def is_cacheable_request(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+    )
+
+
+def add_surrogate_keys(request, *scopes):
+    """Помечает кэшируемую страницу областями, от которых она зависит.
+
+    Токены поколений читаются сразу: вызывать до чтения данных, которые
+    показывает страница, чтобы изменение, случившееся во время отрисовки,
+    сбросило и её.
+    """
+    keys = getattr(request, "surrogate_keys", None)
+    if keys is None:
+        return
+    scopes = [scope for scope in dict.fromkeys(scopes) if scope not in keys]
+    keys.update(zip(scopes, get_generations(*scopes)))
+
+
+def _cache_key(request):
+    url = request.build_absolute_uri()
+    return KEY_PREFIX + hashlib.md5(url.encode()).hexdigest()
+
+
+def get_cached_response(request):
+    """Ответ из кэша, если поколения всех его ключей не сменились."""
+    entry = cache.get(_cache_key(request))
+    if entry is None:
+        return None
+    keys = entry["keys"]
+    if get_generations(*keys) != list(keys.values()):
+        return None
+    response = HttpResponse(entry["content"], status=entry["status"])
+    for header, value in entry["headers"]:
+        response[header] = value
+    response[SURROGATE_KEY_HEADER] = " ".join(keys)
+    return response
+
+
+def _is_cacheable_response(request, response):
+    return (
+        request.method == "GET"
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header("Vary")
+        and "private" not in response.get("Cache-Control", "")
+        and not request.META.get("CSRF_COOKIE_USED")
+    )
+
+
+def store_response(request, response):
+    """Сохраняет ответ, помеченный хотя бы одним суррогатным ключом."""
+    keys = request.surrogate_keys
+    # Страницу без ключей нечем сбросить: её не кэшируем
+    if not keys or not _is_cacheable_response(request, response):
+        return False
+    timeout = getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 60)
+    if reads_from_replica():
+        # Как и у фрагментов: реплика могла ещё не получить запись
+        timeout = min(timeout, settings.REPLICA_LAG_SECONDS)
+    entry = {
+        "keys": keys,
+        "status": response.status_code,
+        "headers": list(response.items()),
+        "content": response.content,
+    }
+    cache.set(_cache_key(request), entry, timeout)
+    response[SURROGATE_KEY_HEADER] = " ".join(keys)
+    return True
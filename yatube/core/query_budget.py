@@ -0,0 +1,72 @@
+"""Учёт SQL-запросов и бюджет запросов на представление.
+
+Представление объявляет максимум запросов атрибутом query_budget
+(у класса) или декоратором @query_budget(n) (у функции); проверяет
+бюджет QueryBudgetMiddleware, а в тестах — assert_max_queries.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """execute_wrapper, считающий число и суммарное время запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.queries.append(sql)
+
+
+@contextmanager
+def count_queries():
+    """Считает запросы ко всем базам внутри блока with."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """Падает, если внутри блока выполнено больше limit запросов."""
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"{counter.count} queries executed, {limit} expected at most:\n"
+            + "\n".join(counter.queries)
+        )
+
+
+def query_budget(limit):
+    """Объявляет бюджет запросов функции-представления."""
+
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+
+    return decorator
+
+
+def get_query_budget(view_func):
+    budget = getattr(view_func, "query_budget", None)
+    if budget is None:
+        view_class = getattr(view_func, "view_class", None)
+        budget = getattr(view_class, "query_budget", None)
+    return budget
@@ -0,0 +1,46 @@
+"""Продакшен-настройки соединений SQLite.
+
+По умолчанию SQLite ведёт журнал отката: пока add_comment фиксирует
+транзакцию, читатели ждут блокировку. PRAGMA из SQLITE_PRAGMAS
+выполняются при создании каждого соединения (сигнал connection_created):
+
+* journal_mode=WAL — читатели не блокируют писателя и наоборот;
+* synchronous=NORMAL — в режиме WAL fsync только при контрольной точке,
+  база не повреждается при сбое, теряются лишь последние транзакции;
+* mmap_size — страницы читаются из отображённого в память файла;
+* busy_timeout — писатель ждёт блокировку, а не падает сразу.
+
+Соединения живут CONN_MAX_AGE секунд, поэтому PRAGMA и открытие файла
+оплачиваются не на каждом запросе. Реплики (DATABASE_REPLICAS) — копии
+файла, которые подменяет sync_replicas: их журнал не переключается, а
+запись в них запрещена.
+"""
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,
+}
+
+
+def get_pragmas(alias):
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", DEFAULT_PRAGMAS))
+    if alias in getattr(settings, "DATABASE_REPLICAS", []):
+        pragmas.pop("journal_mode", None)
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполняет PRAGMA на соединении sqlite3."""
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    # Мимо курсора Django: PRAGMA не попадают в счётчики запросов
+    apply_pragmas(connection.connection, get_pragmas(connection.alias))
@@ -0,0 +1,180 @@
+"""Очередь фоновых задач в основной базе, без внешнего брокера.
+
+Функция, помеченная @task, ставится в очередь вызовом enqueue(): строка
+Task пишется в той же транзакции, что и данные, поэтому задача видна
+воркеру только после фиксации и пропадает при откате. Команда run_tasks
+запускает пул процессов, каждый из которых забирает задачи одним UPDATE
+(сначала с большим priority, затем с ранним run_at) и выполняет их.
+
+* Повторы: упавшая задача откладывается на retry_delay * 2 ** (n - 1)
+  секунд, после max_attempts попыток остаётся в статусе failed.
+* Дедупликация: пока задача с ключом key ждёт в очереди, такие же
+  постановки игнорируются.
+* Отложенный запуск: run_at или countdown в секундах.
+
+Выполненные задачи удаляются. Задачу, взятую упавшим воркером, через
+TASKS_TIMEOUT секунд снова берёт другой.
+"""
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = getattr(settings, "TASKS_TIMEOUT", 10 * 60)
+DEFAULT_RETRY_DELAY = 30
+
+
+class TaskFunction:
+    """Функция-задача: вызывается как обычно или ставится в очередь."""
+
+    def __init__(self, func, priority, max_attempts, retry_delay):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(
+        self,
+        *args,
+        key=None,
+        priority=None,
+        run_at=None,
+        countdown=None,
+        **kwargs,
+    ):
+        """Ставит вызов в очередь; аргументы должны сериализоваться в JSON."""
+        if run_at is None:
+            run_at = timezone.now()
+        if countdown:
+            run_at += timedelta(seconds=countdown)
+        Task.objects.bulk_create(
+            [
+                Task(
+                    name=self.name,
+                    args=json.dumps(args),
+                    kwargs=json.dumps(kwargs),
+                    key=key,
+                    priority=self.priority if priority is None else priority,
+                    run_at=run_at,
+                    max_attempts=self.max_attempts,
+                )
+            ],
+            # Повтор ключа упирается в частичный уникальный индекс
+            ignore_conflicts=key is not None,
+        )
+
+
+def task(
+    func=None, *, priority=0, max_attempts=3, retry_delay=DEFAULT_RETRY_DELAY
+):
+    """Декоратор функции, которую можно выполнить в фоне."""
+
+    def decorate(func):
+        return TaskFunction(func, priority, max_attempts, retry_delay)
+
+    return decorate(func) if func is not None else decorate
+
+
+def requeue_stale(now=None):
+    """Возвращает в очередь задачи, воркер которых не ответил TIMEOUT."""
+    now = now or timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=now - timedelta(seconds=TIMEOUT)
+    )
+    requeued = 0
+    error = "Воркер не завершил задачу за TASKS_TIMEOUT"
+    for row in stale.only("id", "attempts", "max_attempts"):
+        if row.attempts >= row.max_attempts:
+            _fail(row.id, error)
+        else:
+            requeued += _reschedule(row.id, now, error)
+    return requeued
+
+
+def claim(now=None):
+    """Забирает следующую готовую задачу или возвращает None."""
+    now = now or timezone.now()
+    due = Task.objects.filter(status=Task.PENDING, run_at__lte=now)
+    next_id = due.order_by("-priority", "run_at", "id").values("id")[:1]
+    token = uuid.uuid4().hex
+    # Один UPDATE: две конкурирующие выборки не возьмут одну задачу
+    claimed = due.filter(id=Subquery(next_id)).update(
+        status=Task.RUNNING,
+        locked_by=token,
+        locked_at=now,
+        attempts=F("attempts") + 1,
+    )
+    if not claimed:
+        return None
+    return Task.objects.get(locked_by=token)
+
+
+def _reschedule(task_id, run_at, error):
+    try:
+        with transaction.atomic():
+            return Task.objects.filter(id=task_id).update(
+                status=Task.PENDING,
+                run_at=run_at,
+                locked_by="",
+                last_error=error,
+            )
+    except IntegrityError:
+        # В очереди уже ждёт задача с тем же ключом: она и выполнит работу
+        return Task.objects.filter(id=task_id).delete()[0]
+
+
+def _fail(task_id, error):
+    Task.objects.filter(id=task_id).update(
+        status=Task.FAILED, locked_by="", last_error=error
+    )
+
+
+def execute(row):
+    """Выполняет взятую задачу; True, если она завершилась успешно."""
+    retry_delay = DEFAULT_RETRY_DELAY
+    try:
+        func = import_string(row.name)
+        retry_delay = getattr(func, "retry_delay", retry_delay)
+        with transaction.atomic():
+            func(*json.loads(row.args), **json.loads(row.kwargs))
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Задача %s #%s упала", row.name, row.id)
+        if row.attempts >= row.max_attempts:
+            _fail(row.id, error)
+        else:
+            delay = retry_delay * 2 ** (row.attempts - 1)
+            run_at = timezone.now() + timedelta(seconds=delay)
+            _reschedule(row.id, run_at, error)
+        return False
+    Task.objects.filter(id=row.id, locked_by=row.locked_by).delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи в текущем процессе; возвращает их число."""
+    requeue_stale()
+    done = 0
+    while limit is None or done < limit:
+        row = claim()
+        if row is None:
+            break
+        execute(row)
+        done += 1
+    return done
@@ -1,4 +1,45 @@
-from django.test import TestCase, Client
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import unquote
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import db_router
+from core.cache import SQLiteCache
+from core.management.commands.sync_replicas import copy_database
+from core.sqlite import get_pragmas
+from core.middleware import ReplicaMiddleware
+from core.models import Task
+from core.tasks import claim, requeue_stale, run_pending, task
+from posts.models import Post
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2, retry_delay=10)
+def broken():
+    raise ValueError("сбой")
 
 
 class CoreURLTests(TestCase):
@@ -10,3 +51,391 @@ class CoreURLTests(TestCase):
         template = "core/404.html"
         response = self.guest_client.get("/unexisting_page/")
         self.assertTemplateUsed(response, template)
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request_has_metrics(self):
+        """Выбранный запрос получает Server-Timing и строку в логе."""
+        with self.assertLogs("core.timing", "INFO") as logs:
+            response = self.client.get("/")
+        header = response["Server-Timing"]
+        for metric in ("total;dur=", "db;dur=", "cache;dur=", "template;dur="):
+            self.assertIn(metric, header)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["view"], "posts:index")
+        self.assertEqual(entry["status"], 200)
+        self.assertGreater(entry["template_ms"], 0)
+        self.assertGreater(entry["cache_misses"], 0)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled_request(self):
+        """Без выборки метрики не собираются."""
+        response = self.client.get("/")
+        self.assertFalse(response.has_header("Server-Timing"))
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(100))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaServeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, "posts"), exist_ok=True)
+        os.makedirs(os.path.join(MEDIA_ROOT, "cache"), exist_ok=True)
+        for name in ("posts/file.bin", "posts/фото.bin", "cache/thumb.bin"):
+            with open(os.path.join(MEDIA_ROOT, name), "wb") as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с ETag; миниатюры кэшируются надолго."""
+        response = self.client.get("/media/posts/file.bin")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        # Имя картинки поста освобождается после её нормализации
+        self.assertNotIn("immutable", response["Cache-Control"])
+        thumbnail = self.client.get("/media/cache/thumb.bin")
+        self.assertIn("immutable", thumbnail["Cache-Control"])
+        b"".join(thumbnail.streaming_content)
+
+    def test_conditional_request(self):
+        """Повторный запрос с известным ETag получает 304."""
+        response = self.client.get("/media/posts/file.bin")
+        b"".join(response.streaming_content)
+        repeated = self.client.get(
+            "/media/posts/file.bin", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(repeated.status_code, 304)
+
+    def test_range_requests(self):
+        """Диапазоны байт отдаются кодом 206, неверные — 416."""
+        cases = {
+            "bytes=10-19": (10, 19),
+            "bytes=90-": (90, 99),
+            "bytes=-5": (95, 99),
+            "bytes=95-500": (95, 99),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(
+                    "/media/posts/file.bin", HTTP_RANGE=header
+                )
+                self.assertEqual(response.status_code, 206)
+                body = b"".join(response.streaming_content)
+                self.assertEqual(body, CONTENT[start:end + 1])
+                self.assertEqual(
+                    response["Content-Range"], f"bytes {start}-{end}/100"
+                )
+        response = self.client.get(
+            "/media/posts/file.bin", HTTP_RANGE="bytes=200-"
+        )
+        self.assertEqual(response.status_code, 416)
+        response = self.client.get(
+            "/media/posts/file.bin",
+            HTTP_RANGE="bytes=10-19",
+            HTTP_IF_RANGE='"changed"',
+        )
+        self.assertEqual(response.status_code, 200)
+        b"".join(response.streaming_content)
+
+    def test_sendfile_offload(self):
+        """С MEDIA_SENDFILE отправку файла выполняет веб-сервер."""
+        with mock.patch("core.media.SENDFILE", "x-accel-redirect"):
+            response = self.client.get("/media/posts/file.bin")
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/posts/file.bin"
+        )
+        self.assertEqual(response.content, b"")
+
+    def test_sendfile_offload_non_ascii_name(self):
+        """Кириллица в имени файла передаётся веб-серверу URL-кодированной."""
+        with mock.patch("core.media.SENDFILE", "x-accel-redirect"):
+            response = self.client.get("/media/posts/фото.bin")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/posts/%D1%84%D0%BE%D1%82%D0%BE.bin",
+        )
+        with mock.patch("core.media.SENDFILE", "x-sendfile"):
+            response = self.client.get("/media/posts/фото.bin")
+        self.assertEqual(
+            unquote(response["X-Sendfile"]),
+            os.path.join(MEDIA_ROOT, "posts", "фото.bin"),
+        )
+
+    def test_missing_and_outside_files(self):
+        """Отсутствующие файлы и пути вне MEDIA_ROOT дают 404."""
+        for path in ("/media/posts/none.bin", "/media/../settings.py"):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr("counter")
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, "cache.sqlite3")
+        self.cache = self.create_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def create_cache(self, **options):
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_values_shared_between_instances(self):
+        """Записи и очистка видны всем экземплярам с тем же файлом."""
+        other = self.create_cache()
+        self.cache.set("post", {"text": "Тестовый пост"})
+        self.cache.set_many({"one": 1, "two": [2]})
+        self.assertEqual(other.get("post"), {"text": "Тестовый пост"})
+        self.assertEqual(
+            other.get_many(["one", "two", "three"]), {"one": 1, "two": [2]}
+        )
+        other.clear()
+        self.assertIsNone(self.cache.get("post"))
+
+    def test_timeout_and_add(self):
+        """Просроченная запись не отдаётся, add() не перезаписывает живую."""
+        self.cache.set("expired", "value", 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("expired"))
+        self.assertFalse(self.cache.has_key("expired"))
+        self.assertTrue(self.cache.add("expired", "new"))
+        self.assertFalse(self.cache.add("expired", "newer"))
+        self.assertEqual(self.cache.get("expired"), "new")
+        self.cache.delete("expired")
+        self.assertIsNone(self.cache.get("expired"))
+
+    def test_incr_is_atomic_between_processes(self):
+        """Инкременты из разных процессов не теряются."""
+        self.cache.set("counter", 0)
+        with ProcessPoolExecutor(4) as pool:
+            list(pool.map(increment, [self.location] * 4, [50] * 4))
+        self.assertEqual(self.cache.get("counter"), 200)
+        self.assertEqual(self.cache.decr("counter", 10), 190)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_lru_eviction(self):
+        """При переполнении удаляются давно не читавшиеся записи."""
+        cache = self.create_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        cache.set_many({f"key{number}": number for number in range(10)})
+        cache._connection().execute("UPDATE cache SET accessed = rowid")
+        cache.get("key0")
+        cache.set("key10", 10)
+        self.assertEqual(cache.get("key0"), 0)
+        self.assertEqual(cache.get("key10"), 10)
+        self.assertIsNone(cache.get("key1"))
+        self.assertEqual(cache._stats(cache._connection())[0], 6)
+
+    def test_size_limit(self):
+        """Суммарный объём значений не превышает MAX_SIZE."""
+        cache = self.create_cache(MAX_SIZE=10000)
+        for number in range(20):
+            cache.set(f"key{number}", "x" * 1000)
+        entries, size = cache._stats(cache._connection())
+        self.assertLessEqual(size, 10000)
+        self.assertGreater(entries, 0)
+        self.assertEqual(cache.get("key19"), "x" * 1000)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db_router.ReplicaRouter()
+
+    def test_reads_go_to_replica_until_write(self):
+        """Чтения идут на реплику, после записи — в основную базу."""
+        with db_router.routing(use_replica=True):
+            self.assertEqual(self.router.db_for_read(Post), "replica1")
+            self.assertIsNone(self.router.db_for_read(Session))
+            self.assertEqual(self.router.db_for_write(Post), "default")
+            self.assertIsNone(self.router.db_for_read(Post))
+        with db_router.routing(use_replica=False):
+            self.assertIsNone(self.router.db_for_read(Post))
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_replicas_are_not_migrated(self):
+        """Схему реплик не мигрируют: они копии основной базы."""
+        self.assertTrue(self.router.allow_migrate("default", "posts"))
+        self.assertFalse(self.router.allow_migrate("replica1", "posts"))
+
+    def test_copy_database(self):
+        """sync_replicas копирует основную SQLite-базу в файл реплики."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, "primary.sqlite3")
+        target = os.path.join(directory, "replica.sqlite3")
+        with sqlite3.connect(source) as connection:
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("CREATE TABLE post (text)")
+            connection.execute("INSERT INTO post VALUES ('Тестовый пост')")
+        copy_database(source, target)
+        with sqlite3.connect(target) as connection:
+            rows = connection.execute("SELECT text FROM post").fetchall()
+            mode = connection.execute("PRAGMA journal_mode").fetchone()
+        self.assertEqual(rows, [("Тестовый пост",)])
+        self.assertEqual(mode, ("delete",))
+
+
+class ReplicaMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="auth")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый пост")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент получает куку чтения с основной базы."""
+        response = self.client.get(reverse("posts:index"))
+        self.assertNotIn(ReplicaMiddleware.PIN_COOKIE, response.cookies)
+        self.assertTrue(response.wsgi_request.replica_state.use_replica)
+        response = self.client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.id}),
+            {"text": "Комментарий"},
+        )
+        self.assertIn(ReplicaMiddleware.PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse("posts:index"))
+        self.assertFalse(response.wsgi_request.replica_state.use_replica)
+
+    def test_write_views_use_primary(self):
+        """Представления, которые пишут, не читают с реплик."""
+        response = self.client.get(reverse("posts:post_create"))
+        self.assertFalse(response.wsgi_request.replica_state.use_replica)
+
+
+class SQLiteTuningTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """PRAGMA из SQLITE_PRAGMAS выполнены при создании соединения."""
+        # 1 — NORMAL
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_replicas_are_read_only(self):
+        """Журнал реплик не переключается, запись в них запрещена."""
+        pragmas = get_pragmas("replica1")
+        self.assertNotIn("journal_mode", pragmas)
+        self.assertEqual(pragmas["query_only"], "ON")
+        self.assertEqual(get_pragmas("default")["journal_mode"], "WAL")
+
+    def test_benchmark(self):
+        """Бенчмарк сравнивает оба режима под чтением и записью."""
+        out = StringIO()
+        call_command(
+            "sqlite_benchmark",
+            readers=1,
+            writers=1,
+            duration=0.2,
+            posts=10,
+            stdout=out,
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        for line in lines:
+            self.assertIn("ошибок блокировки", line)
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_priority_and_order(self):
+        """Сначала выполняются задачи с большим приоритетом, затем старые."""
+        record.enqueue("first")
+        record.enqueue("second")
+        record.enqueue("urgent", priority=10)
+        self.assertEqual(run_pending(), 3)
+        self.assertEqual(calls, ["urgent", "first", "second"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_key_deduplicates_pending_tasks(self):
+        """Пока задача с ключом ждёт, повторная постановка игнорируется."""
+        record.enqueue("once", key="same")
+        record.enqueue("twice", key="same")
+        run_pending()
+        record.enqueue("again", key="same")
+        run_pending()
+        self.assertEqual(calls, ["once", "again"])
+
+    def test_countdown(self):
+        """Отложенная задача не выполняется раньше срока."""
+        record.enqueue("later", countdown=60)
+        self.assertEqual(run_pending(), 0)
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, ["later"])
+
+    def test_retry_with_backoff_then_fail(self):
+        """Упавшая задача откладывается, после max_attempts — failed."""
+        broken.enqueue()
+        start = timezone.now()
+        run_pending()
+        row = Task.objects.get()
+        self.assertEqual(row.status, Task.PENDING)
+        self.assertGreaterEqual(row.run_at, start + timedelta(seconds=10))
+        self.assertIn("ValueError", row.last_error)
+        Task.objects.update(run_at=timezone.now())
+        run_pending()
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.FAILED)
+        self.assertEqual(row.attempts, 2)
+
+    def test_stale_task_is_requeued(self):
+        """Задачу зависшего воркера возвращает в очередь другой."""
+        record.enqueue("lost")
+        claim()
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(requeue_stale(), 0)
+        Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, ["lost"])
+
+    def test_task_is_not_queued_on_rollback(self):
+        """Постановка в откатившейся транзакции не оставляет задачу."""
+        try:
+            with transaction.atomic():
+                record.enqueue("rolled back")
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(
+        EMAIL_BACKEND="core.mail.QueuedEmailBackend",
+        TASKS_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    )
+    def test_mail_goes_through_queue(self):
+        """Письмо ставится в очередь и отправляется воркером."""
+        mail.send_mail("Тема", "Текст", "from@example.com", ["to@example.com"])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Task.objects.get().name, "core.mail.send_email")
+        call_command("run_tasks", workers=1, once=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Тема")
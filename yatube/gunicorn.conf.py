@@ -0,0 +1,21 @@
+"""Настройки gunicorn: gunicorn -c gunicorn.conf.py yatube.wsgi
+
+Django 2.2 не умеет ASGI и асинхронные представления, поэтому медленные
+страницы (профиль, лента подписок) обслуживаются потоками: процесс с
+воркером gthread держит GUNICORN_THREADS запросов сразу, и запрос,
+ждущий БД или диск, занимает поток, а не весь процесс.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:8000")
+workers = int(
+    os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = 30
+keepalive = 5
+# Перезапуск воркеров ограничивает рост памяти от утечек в библиотеках
+max_requests = 2000
+max_requests_jitter = 200
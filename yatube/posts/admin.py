@@ -1,5 +1,8 @@
 from django.contrib import admin
 from .models import Post, Group, Follow, Comment
+from . import search
+
+ADMIN_SEARCH_LIMIT = 1000
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +18,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_supported():
+            return super().get_search_results(request, queryset, search_term)
+        ids = search.matching_ids(search_term, ADMIN_SEARCH_LIMIT)
+        return queryset.filter(id__in=ids), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,201 @@
+"""JSON API лент, постов и комментариев для мобильных клиентов.
+
+Ответ помечается ETag из поколений кэша (core.generations) тех областей,
+от которых он зависит. Поэтому повторный запрос с If-None-Match получает
+304, не читая посты из БД. Last-Modified по pub_date не отдаётся:
+редактирование поста не меняет дату публикации, и клиент пропустил бы
+правку.
+
+Параметры запроса:
+    cursor — курсор страницы из полей next/previous ответа;
+    fields — нужные поля через запятую, например fields=id,text,author.
+"""
+import hashlib
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from core.generations import get_version
+from core.query_budget import query_budget
+from .models import Post
+from .objects import get_group_or_404, get_user_or_404
+from .paginators import (
+    COMMENT_ORDERING,
+    CURSOR_PARAM,
+    DEFAULT_ORDERING,
+    CursorPaginator,
+)
+from .scopes import (
+    ALL_POSTS,
+    comments_scope,
+    group_scope,
+    post_scope,
+    profile_scope,
+)
+
+PAGE_SIZE = 20
+FIELDS_PARAM = "fields"
+
+
+def _image_url(post):
+    return post.image.url if post.image else None
+
+
+POST_FIELDS = {
+    "id": lambda post: post.id,
+    "text": lambda post: post.text,
+    "pub_date": lambda post: post.pub_date.isoformat(),
+    "author": lambda post: post.author.username,
+    "author_name": lambda post: post.author.get_full_name(),
+    "group": lambda post: post.group.slug if post.group else None,
+    "image": _image_url,
+    "image_width": lambda post: post.image_width,
+    "image_height": lambda post: post.image_height,
+    "comments_count": lambda post: post.comments_count,
+}
+
+COMMENT_FIELDS = {
+    "id": lambda comment: comment.id,
+    "text": lambda comment: comment.text,
+    "pub_date": lambda comment: comment.pub_date.isoformat(),
+    "author": lambda comment: comment.author.username,
+}
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def _selected_fields(request, available):
+    names = request.GET.get(FIELDS_PARAM)
+    if not names:
+        return available
+    selected = {}
+    for name in names.split(","):
+        name = name.strip()
+        if name not in available:
+            raise InvalidFields(name)
+        selected[name] = available[name]
+    return selected
+
+
+def _serialize(obj, fields):
+    return {name: getter(obj) for name, getter in fields.items()}
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params[CURSOR_PARAM] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+def _etag(request, scopes):
+    # Одна версия данных отдаётся разными страницами и наборами полей
+    version = get_version(*scopes)
+    raw = f"{version}:{request.get_full_path()}"
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def _respond(request, scopes, available_fields, build, count_scopes=()):
+    """Отвечает 304 по ETag или строит данные функцией build(fields).
+
+    count_scopes входят в ETag, только если запрошено comments_count:
+    клиент без счётчиков не перекачивает ленту после каждого комментария.
+    """
+    try:
+        fields = _selected_fields(request, available_fields)
+    except InvalidFields as error:
+        return JsonResponse(
+            {"error": f"Неизвестное поле: {error}"},
+            status=400,
+            json_dumps_params={"ensure_ascii": False},
+        )
+    if "comments_count" in fields:
+        scopes = [*scopes, *count_scopes]
+    etag = _etag(request, scopes)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(
+            build(fields), json_dumps_params={"ensure_ascii": False}
+        )
+    response["ETag"] = etag
+    # Клиент хранит ответ, но перед каждым показом сверяет ETag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _paginated(request, queryset, fields, ordering=DEFAULT_ORDERING):
+    paginator = CursorPaginator(queryset, PAGE_SIZE, ordering)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return {
+        "results": [_serialize(obj, fields) for obj in page],
+        "next": _page_url(request, page.next_cursor),
+        "previous": _page_url(request, page.previous_cursor),
+    }
+
+
+def _feed(request, queryset, *scopes):
+    queryset = queryset.select_related("author", "group")
+    return _respond(
+        request,
+        scopes,
+        POST_FIELDS,
+        lambda fields: _paginated(request, queryset, fields),
+        [comments_scope(scope) for scope in scopes],
+    )
+
+
+@require_safe
+@query_budget(2)
+def index(request):
+    return _feed(request, Post.objects.all(), ALL_POSTS)
+
+
+@require_safe
+@query_budget(3)
+def group_posts(request, slug):
+    group_id = get_group_or_404(slug).id
+    return _feed(
+        request, Post.objects.filter(group_id=group_id), group_scope(group_id)
+    )
+
+
+@require_safe
+@query_budget(3)
+def profile_posts(request, username):
+    author_id = get_user_or_404(username).id
+    return _feed(
+        request,
+        Post.objects.filter(author_id=author_id),
+        profile_scope(author_id),
+    )
+
+
+@require_safe
+@query_budget(2)
+def post_detail(request, post_id):
+    def build(fields):
+        post = get_object_or_404(
+            Post.objects.select_related("author", "group"), id=post_id
+        )
+        return _serialize(post, fields)
+
+    # Имя автора меняет ALL_POSTS, пост и его комментарии — post_scope
+    scopes = (ALL_POSTS, post_scope(post_id))
+    return _respond(request, scopes, POST_FIELDS, build)
+
+
+@require_safe
+@query_budget(3)
+def post_comments(request, post_id):
+    def build(fields):
+        post = get_object_or_404(Post.objects.only("id"), id=post_id)
+        queryset = post.comments.select_related("author")
+        return _paginated(request, queryset, fields, COMMENT_ORDERING)
+
+    scopes = (ALL_POSTS, post_scope(post_id))
+    return _respond(request, scopes, COMMENT_FIELDS, build)
@@ -0,0 +1,51 @@
+"""Помощники массовой загрузки данных в обход форм и сигналов.
+
+bulk_create не посылает сигналов, поэтому после загрузки производные
+данные (счётчики, поисковый индекс, ленты подписок, тренд) пересчитываются
+целиком функцией rebuild_derived().
+"""
+import itertools
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+
+from . import search, timeline, trending
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def explicit_pub_dates(*models):
+    """Даёт задать pub_date вручную: auto_now_add перезаписал бы его."""
+    fields = [model._meta.get_field("pub_date") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def rebuild_derived(stdout):
+    """Пересчитывает счётчики, поиск, ленты и тренд после загрузки."""
+    call_command("recount_stats", stdout=stdout)
+    if search.is_supported():
+        call_command("rebuild_search_index", stdout=stdout)
+    with transaction.atomic():
+        entries = timeline.rebuild_from_follows()
+    stdout.write(f"Записей в лентах подписок: {entries}")
+    with transaction.atomic():
+        scores = trending.rebuild()
+    stdout.write(f"Постов в тренде: {scores}")
+    # Закэшированные страницы и поколения описывают старые данные
+    cache.clear()
@@ -0,0 +1,83 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарными UPDATE ... SET x = x + 1 из обработчиков
+сигналов, то есть в той же транзакции, что и сама запись. Команда
+recount_stats пересчитывает их с нуля, если счётчики разошлись.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def change_user_stats(user_id, **deltas):
+    """Прибавляет deltas к счётчикам пользователя."""
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        }
+    )
+    # Строки счётчиков может не быть у пользователей, созданных в обход
+    # сигналов; при уменьшении её не создаём, чтобы не мешать каскадному
+    # удалению пользователя.
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        recount_users([user_id])
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(id=post_id).update(
+        comments_count=Greatest(F("comments_count") + delta, 0)
+    )
+
+
+def _count(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount_users(user_ids):
+    """Пересчитывает счётчики пользователей с заданными id."""
+    rows = (
+        User.objects.filter(pk__in=user_ids)
+        .annotate(
+            posts_total=_count(Post, "author"),
+            followers_total=_count(Follow, "author"),
+            following_total=_count(Follow, "user"),
+        )
+        .values_list(
+            "pk", "posts_total", "followers_total", "following_total"
+        )
+    )
+    stats = [
+        UserStats(
+            user_id=pk,
+            posts_count=posts,
+            followers_count=followers,
+            following_count=following,
+        )
+        for pk, posts, followers, following in rows
+    ]
+    UserStats.objects.bulk_create(stats, ignore_conflicts=True)
+    UserStats.objects.bulk_update(
+        stats, ["posts_count", "followers_count", "following_count"]
+    )
+    return len(stats)
+
+
+def recount_posts(post_ids):
+    """Пересчитывает число комментариев постов с заданными id."""
+    posts = [
+        Post(id=pk, comments_count=total)
+        for pk, total in Post.objects.filter(pk__in=post_ids)
+        .annotate(total=_count(Comment, "post"))
+        .values_list("pk", "total")
+    ]
+    Post.objects.bulk_update(posts, ["comments_count"])
+    return len(posts)
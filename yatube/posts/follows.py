@@ -0,0 +1,43 @@
+"""Состояние подписок текущего пользователя.
+
+Подписка проверяется запросом EXISTS по уникальному индексу (user, author),
+а не выборкой всех подписчиков автора, поэтому стоимость не зависит от
+их числа. Для списков постов followed_author_ids() отвечает сразу за всех
+авторов страницы одним запросом.
+"""
+from .models import Follow
+
+
+def is_following(user, author):
+    """Подписан ли user на author."""
+    if not user.is_authenticated or user.id == author.id:
+        return False
+    return Follow.objects.filter(user=user, author=author).exists()
+
+
+def followed_author_ids(user, author_ids):
+    """Множество id из author_ids, на которых подписан user."""
+    author_ids = set(author_ids)
+    if not user.is_authenticated:
+        return set()
+    author_ids.discard(user.id)
+    if not author_ids:
+        return set()
+    return set(
+        Follow.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list("author_id", flat=True)
+    )
+
+
+def follow_state_key(user, author_ids, followed_ids):
+    """Часть ключа кэша фрагмента, зависящая от подписок пользователя.
+
+    Кнопки подписки на карточках зависят только от того, на кого из
+    авторов страницы подписан пользователь и есть ли среди них он сам,
+    поэтому пользователи с одинаковым состоянием делят один фрагмент.
+    """
+    if not user.is_authenticated:
+        return ""
+    own = user.id if user.id in author_ids else ""
+    return f"{own}:{','.join(map(str, sorted(followed_ids)))}"
@@ -1,5 +1,8 @@
 from django import forms
-from .models import Post, Comment
+from django.core.files.uploadedfile import UploadedFile
+
+from .models import Post, Comment, Group
+from .objects import get_user
 
 
 class PostForm(forms.ModelForm):
@@ -16,8 +19,46 @@ class PostForm(forms.ModelForm):
             "image": "Картинка для поста",
         }
 
+    def _get_validation_exclusions(self):
+        # Группу уже выбрал из БД ModelChoiceField: проверка внешнего
+        # ключа в Post.full_clean() повторила бы тот же запрос
+        return super()._get_validation_exclusions() + ["group"]
+
+    def clean_image(self):
+        image = self.cleaned_data["image"]
+        if isinstance(image, UploadedFile):
+            # Размеры из заголовка, уже прочитанного при проверке файла;
+            # нормализация (posts.tasks.process_image) их уточнит
+            size = image.image.size
+        elif image:
+            return image
+        else:
+            size = (None, None)
+        self.instance.image_width, self.instance.image_height = size
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ("text",)
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label="Искать", max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        label="Группа",
+        to_field_name="slug",
+        required=False,
+    )
+    author = forms.CharField(label="Автор", max_length=150, required=False)
+
+    def clean_author(self):
+        username = self.cleaned_data["author"]
+        if not username:
+            return None
+        author = get_user(username)
+        if author is None:
+            raise forms.ValidationError("Пользователь не найден")
+        return author
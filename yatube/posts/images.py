@@ -0,0 +1,90 @@
+"""Нормализация картинок постов при загрузке.
+
+Фотографии с камер весят десятки мегабайт, а декодировать их приходится
+при каждой новой миниатюре. Поэтому при загрузке картинка уменьшается до
+MAX_SIZE по большей стороне, поворачивается по EXIF, теряет метаданные и
+перекодируется в WebP (или прогрессивный JPEG, если Pillow собран без
+WebP). Память ограничена: JPEG декодируется сразу в уменьшенном
+масштабе (draft), остальные форматы сначала сжимаются целочисленным
+reduce() и только потом точно масштабируются.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+MAX_SIZE = getattr(settings, "POST_IMAGE_MAX_SIZE", 2048)
+QUALITY = getattr(settings, "POST_IMAGE_QUALITY", 82)
+FORMAT = getattr(
+    settings,
+    "POST_IMAGE_FORMAT",
+    "WEBP" if features.check("webp") else "JPEG",
+)
+
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def _output_format(image):
+    # В JPEG нет прозрачности: такие картинки сохраняются в PNG
+    if FORMAT == "JPEG" and _has_alpha(image):
+        return "PNG"
+    return FORMAT
+
+
+def _save_options(fmt, image):
+    options = {}
+    # Цветовой профиль — не метаданные: без него искажаются цвета
+    if image.info.get("icc_profile"):
+        options["icc_profile"] = image.info["icc_profile"]
+    if fmt == "JPEG":
+        options.update(quality=QUALITY, optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        options.update(quality=QUALITY, method=4)
+    elif fmt == "PNG":
+        options.update(optimize=True)
+    return options
+
+
+def image_size(file):
+    """Ширина и высота картинки; читается только заголовок файла."""
+    with Image.open(file) as image:
+        return image.size
+
+
+def normalize(file):
+    """Перекодированная картинка и её размеры.
+
+    Возвращает файл с новым именем и кортеж (ширина, высота).
+    Анимированные картинки сохраняются как есть: перекодирование
+    оставило бы только первый кадр.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        if getattr(image, "is_animated", False):
+            file.seek(0)
+            return file, image.size
+        # Декодер JPEG сразу уменьшает картинку в 2, 4 или 8 раз, а
+        # reducing_gap сжимает остальные reduce() до точного ресэмплинга
+        image.draft("RGB", (MAX_SIZE, MAX_SIZE))
+        image.thumbnail(
+            (MAX_SIZE, MAX_SIZE), Image.LANCZOS, reducing_gap=2.0
+        )
+        image = ImageOps.exif_transpose(image)
+        fmt = _output_format(image)
+        if fmt == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        elif fmt == "WEBP" and image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, fmt, **_save_options(fmt, image))
+        size = image.size
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    return ContentFile(buffer.getvalue(), name=stem + EXTENSIONS[fmt]), size
@@ -0,0 +1,75 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+def synthetic_follows(users, edges, seed=0):
+    """Случайный граф подписок с популярностью авторов по закону Ципфа."""
+    if recommendations.is_vectorized():
+        np = recommendations.np
+        generator = np.random.default_rng(seed)
+        followers = generator.integers(1, users + 1, edges)
+        authors = generator.zipf(1.5, edges) % users + 1
+        # Повторные подписки и подписки на себя запрещены ограничениями
+        pairs = np.unique(np.stack([followers, authors], axis=1), axis=0)
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        return pairs[:, 0], pairs[:, 1]
+    generator = random.Random(seed)
+    pairs = set()
+    for _ in range(edges):
+        follower = generator.randint(1, users)
+        author = int(generator.paretovariate(0.5)) % users + 1
+        if follower != author:
+            pairs.add((follower, author))
+    followers, authors = zip(*sorted(pairs)) if pairs else ((), ())
+    return list(followers), list(authors)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время и пиковую память расчёта рекомендаций на "
+        "синтетическом графе подписок, ничего не записывая в БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200000)
+        parser.add_argument(
+            "--edges",
+            type=int,
+            action="append",
+            help="Число подписок; можно указать несколько раз. "
+            "По умолчанию 1, 2 и 4 миллиона.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=recommendations.CHUNK_SIZE
+        )
+        parser.add_argument(
+            "--limit", type=int, default=recommendations.LIMIT
+        )
+
+    def handle(self, *args, users, edges, chunk_size, limit, **options):
+        backend = (
+            "SciPy" if recommendations.is_vectorized() else "без NumPy/SciPy"
+        )
+        self.stdout.write(f"Расчёт: {backend}, блок {chunk_size}")
+        for total in edges or [1000000, 2000000, 4000000]:
+            followers, authors = synthetic_follows(users, total)
+            tracemalloc.start()
+            start = time.perf_counter()
+            results = 0
+            for _, top in recommendations.compute(
+                followers, authors, limit, chunk_size
+            ):
+                results += len(top)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f"{len(followers):>9} подписок: {elapsed:7.1f} с, "
+                f"пик памяти {peak / 2 ** 20:7.1f} МБ, "
+                f"рекомендаций {results}"
+            )
@@ -0,0 +1,146 @@
+import json
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.benchmark import find_regressions, measure
+from posts.models import Follow, Group, Post, UserStats
+
+URLCONFS = ("posts.urls", "users.urls", "about.urls")
+
+# GET этих адресов меняет данные: замеры идут в откатываемой транзакции
+MUTATING = {"posts:profile_follow", "posts:profile_unfollow", "users:logout"}
+
+QUERY_STRINGS = {"posts:search": "q={word}&group={slug}"}
+
+
+def iter_routes():
+    """Имена маршрутов и параметры их адресов."""
+    for urlconf in URLCONFS:
+        module = import_module(urlconf)
+        for pattern in module.urlpatterns:
+            name = f"{module.app_name}:{pattern.name}"
+            yield name, list(pattern.pattern.converters)
+
+
+def collect_samples():
+    """Значения параметров адресов: самые нагруженные объекты в БД."""
+    stats = (
+        UserStats.objects.select_related("user")
+        .order_by("-following_count")
+        .first()
+    )
+    if stats is None:
+        raise CommandError("БД пуста: сначала выполните generate_data")
+    reader = stats.user
+    follow = (
+        Follow.objects.filter(user=reader)
+        .select_related("author")
+        .order_by("-author__stats__followers_count")
+        .first()
+    )
+    posts = Post.objects.select_related("author", "group")
+    if follow is not None:
+        posts = posts.filter(author=follow.author)
+    post = posts.first() or Post.objects.first()
+    if post is None:
+        raise CommandError("В БД нет постов: сначала выполните generate_data")
+    group = post.group or Group.objects.first()
+    return reader, {
+        "username": post.author.username,
+        "post_id": post.id,
+        "slug": group.slug if group else "",
+        "word": post.text.split()[0] if post.text.split() else "",
+        "uidb64": urlsafe_base64_encode(force_bytes(reader.pk)),
+    }
+
+
+def allowed_host():
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет все адреса posts, users и about: перцентили задержки, "
+        "число SQL-запросов и память; сравнивает с базовым уровнем."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument(
+            "--route",
+            action="append",
+            help="Замерить только этот маршрут, например posts:profile.",
+        )
+        parser.add_argument("--save", help="Сохранить замеры в JSON-файл.")
+        parser.add_argument(
+            "--compare", help="Сравнить с замерами из JSON-файла."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Допустимый относительный рост p95 и памяти.",
+        )
+
+    def handle(self, *args, **options):
+        reader, samples = collect_samples()
+        client = Client(SERVER_NAME=allowed_host())
+        client.force_login(reader)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        # Токен зависит от last_login, который обновил вход
+        samples["token"] = default_token_generator.make_token(reader)
+        results = {}
+        self.stdout.write(
+            f"{'маршрут':<32} {'код':>4} {'p50':>8} {'p95':>8} {'p99':>8} "
+            f"{'SQL':>4} {'память, КБ':>11}"
+        )
+        for name, params in iter_routes():
+            if options["route"] and name not in options["route"]:
+                continue
+            url = reverse(name, kwargs={key: samples[key] for key in params})
+            if name in QUERY_STRINGS:
+                url += "?" + QUERY_STRINGS[name].format(**samples)
+
+            def fetch(url=url):
+                # Выход из аккаунта сбрасывает куку сессии
+                client.cookies[settings.SESSION_COOKIE_NAME] = session
+                return client.get(url)
+
+            result = measure(
+                fetch,
+                options["iterations"],
+                options["warmup"],
+                rollback=name in MUTATING,
+            )
+            results[name] = result
+            self.stdout.write(
+                f"{name:<32} {result['status']:>4} {result['p50']:>6.1f}мс "
+                f"{result['p95']:>6.1f}мс {result['p99']:>6.1f}мс "
+                f"{result['queries']:>4} {result['memory_kb']:>11.0f}"
+            )
+        if options["save"]:
+            with open(options["save"], "w") as file:
+                json.dump({"routes": results}, file, indent=2, sort_keys=True)
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                baseline = json.load(file)["routes"]
+            regressions = find_regressions(
+                results, baseline, options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Ухудшения относительно базового уровня:\n"
+                    + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("Ухудшений не найдено"))
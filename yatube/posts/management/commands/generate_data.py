@@ -0,0 +1,261 @@
+import io
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from PIL import Image
+
+from posts import thumbnails
+from posts.bulk import batches, explicit_pub_dates, rebuild_derived
+from posts.models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    "кот собака утро вечер город море лес река дождь солнце книга фильм "
+    "музыка дорога поезд работа отпуск кофе чай друг семья праздник сад "
+    "зима лето осень весна прогулка новости проект код сервер база данных "
+    "страница лента подписка фото горы озеро ужин завтрак спорт велосипед"
+).split()
+
+# Популярность авторов подчиняется степенному закону: немногие
+# собирают большинство подписчиков и пишут большинство постов.
+ZIPF_EXPONENT = 1.1
+GROUP_SHARE = 0.6
+PASSWORD = "benchmark"
+IMAGE_SIZE = (1280, 720)
+
+
+def power_law_index(rnd, size, exponent=ZIPF_EXPONENT):
+    """Индекс 0..size-1 с вероятностью, убывающей как (index + 1) ** -exponent.
+
+    Обратное преобразование непрерывного степенного распределения не
+    требует таблицы весов, поэтому годится и для миллионов строк.
+    """
+    if exponent == 1:
+        value = size ** rnd.random()
+    else:
+        power = 1 - exponent
+        value = (1 + rnd.random() * (size ** power - 1)) ** (1 / power)
+    return min(int(value) - 1, size - 1)
+
+
+def inserted_ids(model, last_id):
+    """id строк, вставленных после last_id (вставки идут подряд)."""
+    bounds = model.objects.filter(id__gt=last_id).aggregate(
+        first=Min("id"), last=Max("id")
+    )
+    if bounds["first"] is None:
+        return range(0)
+    return range(bounds["first"], bounds["last"] + 1)
+
+
+def last_id(model):
+    return model.objects.aggregate(last=Max("id"))["last"] or 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет БД синтетическими пользователями, постами, подписками "
+        "и комментариями для нагрузочных замеров."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Среднее число подписок пользователя.",
+        )
+        parser.add_argument("--comments", type=int, default=50000)
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=0,
+            help="Число разных картинок; 0 — посты без картинок.",
+        )
+        parser.add_argument("--image-share", type=float, default=0.2)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--skip-derived",
+            action="store_true",
+            help="Не пересчитывать счётчики, поиск и ленты подписок.",
+        )
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        start = time.monotonic()
+        user_ids = self.step("Пользователи", self.create_users, options)
+        group_ids = self.step("Группы", self.create_groups, options)
+        images = self.step("Картинки", self.create_images, options)
+        post_ids = self.step(
+            "Посты", self.create_posts, options, user_ids, group_ids, images
+        )
+        self.step("Подписки", self.create_follows, options, user_ids)
+        self.step(
+            "Комментарии", self.create_comments, options, user_ids, post_ids
+        )
+        if not options["skip_derived"]:
+            self.step("Производные данные", rebuild_derived, self.stdout)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Данные созданы за {time.monotonic() - start:.1f} с"
+            )
+        )
+
+    def step(self, title, func, *args):
+        start = time.monotonic()
+        result = func(*args)
+        self.stdout.write(f"{title}: {time.monotonic() - start:.1f} с")
+        return result
+
+    def bulk_create(self, model, objects, **kwargs):
+        for batch in batches(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+
+    def create_users(self, options):
+        after = last_id(User)
+        # Хэш пароля считается один раз: это самая дорогая часть
+        password = make_password(PASSWORD)
+        self.bulk_create(
+            User,
+            (
+                User(
+                    username=f"user{after + number}",
+                    first_name=self.rnd.choice(WORDS).capitalize(),
+                    last_name=f"{self.rnd.choice(WORDS).capitalize()}ов",
+                    password=password,
+                )
+                for number in range(1, options["users"] + 1)
+            ),
+        )
+        return inserted_ids(User, after)
+
+    def create_groups(self, options):
+        after = last_id(Group)
+        self.bulk_create(
+            Group,
+            (
+                Group(
+                    title=f"Группа {after + number}",
+                    slug=f"group-{after + number}",
+                    description=" ".join(self.rnd.choices(WORDS, k=12)),
+                )
+                for number in range(1, options["groups"] + 1)
+            ),
+        )
+        return inserted_ids(Group, after)
+
+    def create_images(self, options):
+        names = []
+        for number in range(options["images"]):
+            color = tuple(self.rnd.randrange(256) for _ in range(3))
+            image = Image.new("RGB", IMAGE_SIZE, color)
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=85)
+            names.append(
+                default_storage.save(
+                    f"posts/generated_{number}.jpg",
+                    ContentFile(buffer.getvalue()),
+                )
+            )
+        # Как после задачи обработки загруженной картинки: замеры не должны
+        # включать построение миниатюр первым запросом
+        thumbnails.generate_many(names)
+        return names
+
+    def create_posts(self, options, user_ids, group_ids, images):
+        total = options["posts"]
+        end = timezone.now()
+        step = timedelta(days=options["days"]) / max(total, 1)
+        begin = end - step * total
+        rnd = self.rnd
+        # Дата поста вычисляется по его номеру, хранить их не нужно
+        self.post_dates = begin, step
+
+        def posts():
+            for number in range(total):
+                image, size = "", (None, None)
+                if images and rnd.random() < options["image_share"]:
+                    image, size = rnd.choice(images), IMAGE_SIZE
+                group_id = None
+                if group_ids and rnd.random() < GROUP_SHARE:
+                    group_id = rnd.choice(group_ids)
+                author = power_law_index(rnd, len(user_ids))
+                yield Post(
+                    author_id=user_ids[author],
+                    group_id=group_id,
+                    text=" ".join(rnd.choices(WORDS, k=rnd.randint(5, 60))),
+                    image=image,
+                    image_width=size[0],
+                    image_height=size[1],
+                    pub_date=begin + step * number,
+                )
+
+        after = last_id(Post)
+        with explicit_pub_dates(Post):
+            self.bulk_create(Post, posts())
+        return inserted_ids(Post, after)
+
+    def create_follows(self, options, user_ids):
+        rnd = self.rnd
+        average = options["follows"]
+
+        def follows():
+            for user_id in user_ids:
+                # Pareto с параметром 2 имеет среднее 2
+                count = int(average * rnd.paretovariate(2) / 2)
+                count = min(count, len(user_ids) - 1)
+                authors = {
+                    user_ids[power_law_index(rnd, len(user_ids))]
+                    for _ in range(count)
+                }
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        if user_ids and average:
+            self.bulk_create(Follow, follows(), ignore_conflicts=True)
+
+    def create_comments(self, options, user_ids, post_ids):
+        """Комментарии приходят всплесками вскоре после публикации."""
+        rnd = self.rnd
+        total = options["comments"]
+        if not post_ids or not user_ids:
+            return
+        begin, step = self.post_dates
+        now = timezone.now()
+
+        def comments():
+            created = 0
+            while created < total:
+                # Свежие посты обсуждают чаще
+                age = power_law_index(rnd, len(post_ids), exponent=0.8)
+                number = len(post_ids) - 1 - age
+                post_id = post_ids[number]
+                burst = min(int(rnd.paretovariate(1.2)), total - created)
+                moment = begin + step * number
+                for _ in range(burst):
+                    moment += timedelta(minutes=rnd.expovariate(1 / 5))
+                    yield Comment(
+                        post_id=post_id,
+                        author_id=rnd.choice(user_ids),
+                        text=" ".join(rnd.choices(WORDS, k=8)),
+                        pub_date=min(moment, now),
+                    )
+                created += burst
+
+        with explicit_pub_dates(Comment):
+            self.bulk_create(Comment, comments())
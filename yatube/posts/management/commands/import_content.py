@@ -0,0 +1,412 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import batches, explicit_pub_dates, rebuild_derived
+from posts import images
+from posts.models import Comment, Follow, Group, Post, User
+
+KINDS = ("groups", "posts", "comments", "follows")
+FORMATS = ("jsonl", "csv")
+IMAGE_DIR = "posts/"
+# Поля, по которым запись уже есть в базе и bulk_create её пропустит
+UNIQUE_FIELDS = {
+    Group: ("slug",),
+    Post: ("id",),
+    Comment: ("id",),
+    Follow: ("user_id", "author_id"),
+}
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+def _lines(file):
+    for line in iter(file.readline, b""):
+        yield line.decode("utf-8-sig")
+
+
+def iter_records(path, fmt, offset=0):
+    """Записи файла по одной и смещение в байтах сразу после каждой.
+
+    Файл читается построчно, поэтому память не зависит от его размера,
+    а по смещению можно продолжить чтение с контрольной точки.
+    """
+    with open(path, "rb") as file:
+        if fmt == "csv":
+            reader = csv.reader(_lines(file))
+            header = next(reader, None)
+            if offset:
+                file.seek(offset)
+            for row in reader:
+                yield dict(zip(header, row)), file.tell()
+            return
+        if offset:
+            file.seek(offset)
+        for line in _lines(file):
+            if line.strip():
+                try:
+                    yield json.loads(line), file.tell()
+                except ValueError as error:
+                    raise InvalidRecord(f"байт {file.tell()}: {error}")
+
+
+def load_checkpoint(path):
+    """Смещение и число прочитанных записей из контрольной точки."""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"offset": 0, "records": 0}
+
+
+def save_checkpoint(path, offset, records):
+    # Запись через временный файл: обрыв не оставит битую контрольную точку
+    with open(path + ".tmp", "w") as file:
+        json.dump({"offset": offset, "records": records}, file)
+    os.replace(path + ".tmp", path)
+
+
+def new_objects(model, objects):
+    """Объекты, которых ещё нет в базе, без повторов внутри пакета.
+
+    Остальные bulk_create с ignore_conflicts всё равно пропустил бы, а
+    так число загруженных записей совпадает с числом новых строк.
+    """
+    fields = UNIQUE_FIELDS[model]
+    lookups = {
+        f"{field}__in": {getattr(obj, field) for obj in objects}
+        for field in fields
+    }
+    existing = set(model.objects.filter(**lookups).values_list(*fields))
+    new = {}
+    for obj in objects:
+        new.setdefault(tuple(getattr(obj, field) for field in fields), obj)
+    return [obj for key, obj in new.items() if key not in existing]
+
+
+def _digest(file):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(2 ** 16), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _field(record, name):
+    try:
+        return record[name]
+    except KeyError:
+        raise InvalidRecord(f"нет поля {name!r}")
+
+
+def _optional(record, name):
+    # В CSV отсутствующее значение приходит пустой строкой
+    return record.get(name) or None
+
+
+def _id(record, name):
+    try:
+        return int(_field(record, name))
+    except (TypeError, ValueError):
+        raise InvalidRecord(f"поле {name!r} должно быть целым числом")
+
+
+def _pub_date(record):
+    value = _optional(record, "pub_date")
+    if value is None:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise InvalidRecord(f"неверная дата {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоково загружает группы, посты, комментарии или подписки из "
+        "JSONL или CSV пакетами bulk_create с контрольными точками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=KINDS)
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Формат файла; по умолчанию по расширению.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--images-dir",
+            default="",
+            help="Каталог, относительно которого указаны картинки постов.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Число потоков копирования картинок.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Файл контрольной точки; по умолчанию <path>.checkpoint.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Начать сначала, не читая контрольную точку.",
+        )
+        parser.add_argument(
+            "--skip-derived",
+            action="store_true",
+            help="Не пересчитывать счётчики, поиск и ленты подписок.",
+        )
+
+    def handle(self, *args, kind, path, **options):
+        fmt = options["format"] or os.path.splitext(path)[1].lstrip(".")
+        if fmt not in FORMATS:
+            raise CommandError(f"Неизвестный формат файла: {path}")
+        checkpoint = options["checkpoint"] or path + ".checkpoint"
+        state = {"offset": 0, "records": 0}
+        if not options["restart"]:
+            state = load_checkpoint(checkpoint)
+        if state["records"]:
+            self.stdout.write(
+                f"Продолжение с записи {state['records']} "
+                f"(байт {state['offset']})"
+            )
+        self.images_dir = options["images_dir"]
+        self.groups = {}
+        self.skipped = 0
+        build = getattr(self, f"build_{kind}")
+        size = os.path.getsize(path)
+        records = state["records"]
+        imported = 0
+        start = time.monotonic()
+        with ThreadPoolExecutor(options["workers"]) as self.pool:
+            chunks = batches(
+                iter_records(path, fmt, state["offset"]),
+                options["batch_size"],
+            )
+            try:
+                for chunk in chunks:
+                    batch = [record for record, _ in chunk]
+                    model, objects = build(batch)
+                    with transaction.atomic(), explicit_pub_dates(
+                        Post, Comment
+                    ):
+                        model.objects.bulk_create(
+                            objects, ignore_conflicts=True
+                        )
+                    records += len(batch)
+                    imported += len(objects)
+                    save_checkpoint(checkpoint, chunk[-1][1], records)
+                    self.report(records, imported, chunk[-1][1], size, start)
+            except InvalidRecord as error:
+                raise CommandError(
+                    f"Ошибка в записи после {records}-й: {error}"
+                )
+        self.reset_sequences(kind)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено записей: {imported} за {elapsed:.1f} с, "
+                f"пропущено: {self.skipped}"
+            )
+        )
+        if not options["skip_derived"]:
+            rebuild_derived(self.stdout)
+
+    def report(self, records, imported, offset, size, start):
+        elapsed = max(time.monotonic() - start, 1e-6)
+        self.stdout.write(
+            f"{records} записей, {offset / max(size, 1):.0%} файла, "
+            f"{imported / elapsed:.0f} записей/с"
+        )
+
+    def reset_sequences(self, kind):
+        """Посты и комментарии вставлены со своими id: сдвигаем счётчики."""
+        models = {"posts": [Post], "comments": [Comment]}.get(kind, [])
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def user_ids(self, usernames):
+        """id пользователей по именам; недостающие создаются."""
+        usernames = set(usernames)
+        found = dict(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", "id"
+            )
+        )
+        missing = usernames - set(found)
+        if missing:
+            # Войти такие пользователи смогут после сброса пароля
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=name, password=password) for name in missing],
+                ignore_conflicts=True,
+            )
+            found.update(
+                User.objects.filter(username__in=missing).values_list(
+                    "username", "id"
+                )
+            )
+        return found
+
+    def group_ids(self, slugs):
+        missing = set(slugs) - set(self.groups) - {None}
+        if missing:
+            self.groups.update(
+                Group.objects.filter(slug__in=missing).values_list(
+                    "slug", "id"
+                )
+            )
+        return self.groups
+
+    def stored_image(self, stem, source):
+        """Имя и размеры уже сохранённой картинки с этим содержимым."""
+        extensions = {os.path.splitext(source)[1].lower()}
+        extensions.update(images.EXTENSIONS.values())
+        for extension in extensions:
+            name = stem + extension
+            if default_storage.exists(name):
+                with default_storage.open(name) as file:
+                    return name, images.image_size(file)
+        return None
+
+    def ingest_image(self, source):
+        """Нормализует картинку и сохраняет в MEDIA_ROOT/posts/.
+
+        Имя файла — хэш исходного содержимого: одноимённые картинки из
+        разных каталогов не совпадут, одинаковые хранятся один раз, а
+        после обрыва загрузки уже сохранённые файлы не копируются снова.
+        """
+        path = os.path.join(self.images_dir, source)
+        try:
+            with open(path, "rb") as file:
+                stem = IMAGE_DIR + _digest(file)
+                stored = self.stored_image(stem, source)
+                if stored is not None:
+                    return stored
+                normalized, size = images.normalize(file)
+                name = stem + os.path.splitext(normalized.name)[1].lower()
+                saved = default_storage.save(name, normalized)
+        except OSError as error:
+            self.stderr.write(f"Картинка {source} пропущена: {error}")
+            return None
+        if saved != name:
+            # Тот же файл под другим путём успел сохранить соседний поток
+            default_storage.delete(saved)
+        return name, size
+
+    def ingest_images(self, sources):
+        """Имена в хранилище и размеры картинок по исходным путям."""
+        sources = list(sources)
+        return {
+            source: image
+            for source, image in zip(
+                sources, self.pool.map(self.ingest_image, sources)
+            )
+            if image is not None
+        }
+
+    def build_groups(self, batch):
+        groups = [
+            Group(
+                slug=_field(record, "slug"),
+                title=_optional(record, "title") or record["slug"],
+                description=record.get("description") or "",
+            )
+            for record in batch
+        ]
+        return Group, new_objects(Group, groups)
+
+    def build_posts(self, batch):
+        users = self.user_ids(_field(record, "author") for record in batch)
+        groups = self.group_ids(
+            _optional(record, "group") for record in batch
+        )
+        posts = []
+        sources = {}
+        for record in batch:
+            group = _optional(record, "group")
+            if group is not None and group not in groups:
+                self.stderr.write(f"Группа {group} не найдена")
+            posts.append(
+                Post(
+                    id=_id(record, "id"),
+                    author_id=users[record["author"]],
+                    group_id=groups.get(group),
+                    text=_field(record, "text"),
+                    pub_date=_pub_date(record),
+                )
+            )
+            sources[posts[-1].id] = _optional(record, "image")
+        # Картинки копируются только для постов, которых ещё нет в базе
+        posts = new_objects(Post, posts)
+        stored = self.ingest_images(
+            {sources[post.id] for post in posts} - {None}
+        )
+        for post in posts:
+            image = stored.get(sources[post.id])
+            if image is not None:
+                post.image = image[0]
+                post.image_width, post.image_height = image[1]
+        return Post, posts
+
+    def build_comments(self, batch):
+        users = self.user_ids(_field(record, "author") for record in batch)
+        post_ids = {_id(record, "post") for record in batch}
+        existing = set(
+            Post.objects.filter(id__in=post_ids).values_list("id", flat=True)
+        )
+        comments = []
+        for record in batch:
+            if _id(record, "post") not in existing:
+                self.skipped += 1
+                continue
+            comments.append(
+                Comment(
+                    id=_id(record, "id"),
+                    post_id=_id(record, "post"),
+                    author_id=users[record["author"]],
+                    text=_field(record, "text"),
+                    pub_date=_pub_date(record),
+                )
+            )
+        return Comment, new_objects(Comment, comments)
+
+    def build_follows(self, batch):
+        pairs = [
+            (_field(record, "user"), _field(record, "author"))
+            for record in batch
+        ]
+        users = self.user_ids(name for pair in pairs for name in pair)
+        follows = []
+        for user, author in pairs:
+            if user == author:
+                self.skipped += 1
+                continue
+            follows.append(
+                Follow(user_id=users[user], author_id=users[author])
+            )
+        return Follow, new_objects(Follow, follows)
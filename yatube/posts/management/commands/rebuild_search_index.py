@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Заново строит полнотекстовый индекс постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, batch_size, **options):
+        if not search.is_supported():
+            raise CommandError(
+                "Полнотекстовый индекс доступен только в SQLite"
+            )
+        start = time.monotonic()
+        posts = Post.objects.only("id", "text", "author_id", "group_id")
+        indexed = 0
+        with transaction.atomic():
+            search.clear_index()
+            batch = []
+            for post in posts.order_by().iterator(chunk_size=batch_size):
+                batch.append(post)
+                if len(batch) >= batch_size:
+                    search.index_posts(batch, replace=False)
+                    indexed += len(batch)
+                    batch = []
+            search.index_posts(batch, replace=False)
+            indexed += len(batch)
+        search.optimize_index()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Проиндексировано постов: {indexed} "
+                f"за {time.monotonic() - start:.1f} с"
+            )
+        )
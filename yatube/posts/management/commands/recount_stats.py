@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.generations import bump
+from posts.counters import recount_posts, recount_users
+from posts.scopes import post_scope, stats_scope
+from posts.models import Post, User
+
+
+def id_chunks(queryset, chunk_size):
+    """Список id кусками по возрастанию первичного ключа."""
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики постов, комментариев и подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, chunk_size, **options):
+        users = 0
+        for ids in id_chunks(User.objects.all(), chunk_size):
+            with transaction.atomic():
+                users += recount_users(ids)
+                bump(*[stats_scope(user_id) for user_id in ids])
+        posts = 0
+        for ids in id_chunks(Post.objects.all(), chunk_size):
+            with transaction.atomic():
+                posts += recount_posts(ids)
+                bump(*[post_scope(post_id) for post_id in ids])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пересчитано пользователей: {users}, постов: {posts}"
+            )
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет затухшие оценки тренда; с --rebuild пересчитывает их "
+        "по всем комментариям."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Пересчитать оценки с нуля, например после bulk_create.",
+        )
+
+    def handle(self, *args, rebuild, **options):
+        with transaction.atomic():
+            if rebuild:
+                scores = trending.rebuild()
+                message = f"Постов в тренде: {scores}"
+            else:
+                message = f"Удалено затухших оценок: {trending.prune()}"
+        self.stdout.write(self.style.SUCCESS(message))
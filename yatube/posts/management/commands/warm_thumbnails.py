@@ -0,0 +1,56 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import generate_many
+
+
+def image_chunks(chunk_size):
+    names = (
+        Post.objects.exclude(image="")
+        .order_by()
+        .values_list("image", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    chunk = []
+    for name in names:
+        chunk.append(name)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def init_worker():
+    # Унаследованные от родителя соединения с БД в дочернем процессе
+    # использовать нельзя.
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Заранее строит миниатюры картинок всех постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--chunk-size", type=int, default=100)
+
+    def handle(self, *args, workers, chunk_size, **options):
+        start = time.monotonic()
+        chunks = image_chunks(chunk_size)
+        if workers > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+                done = sum(pool.map(generate_many, chunks))
+        else:
+            done = sum(map(generate_many, chunks))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Миниатюры построены для {done} картинок "
+                f"за {time.monotonic() - start:.1f} с"
+            )
+        )
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+TABLE = "posts_post_fts"
+BATCH_SIZE = 2000
+INSERT = (
+    f"INSERT INTO {TABLE} (rowid, text, author_id, group_id) "
+    "VALUES (%s, %s, %s, %s)"
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Post = apps.get_model("posts", "Post")
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "text, author_id UNINDEXED, group_id UNINDEXED)"
+    )
+    rows = Post.objects.order_by().values_list(
+        "id", "text", "author_id", "group_id"
+    )
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for row in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                cursor.executemany(INSERT, batch)
+                batch = []
+        cursor.executemany(INSERT, batch)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0010_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
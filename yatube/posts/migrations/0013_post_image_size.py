@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:32
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_image_sizes(apps, schema_editor):
+    """Записывает размеры уже загруженных картинок (читая заголовки)."""
+    Post = apps.get_model("posts", "Post")
+    posts = (
+        Post.objects.exclude(image="")
+        .filter(image_width__isnull=True)
+        .only("id", "image")
+    )
+    for post in posts.iterator(chunk_size=1000):
+        try:
+            with default_storage.open(post.image.name) as file:
+                with Image.open(file) as image:
+                    width, height = image.size
+        except (OSError, ValueError):
+            continue
+        Post.objects.filter(id=post.id).update(
+            image_width=width, image_height=height
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(fill_image_sizes, migrations.RunPython.noop),
+    ]
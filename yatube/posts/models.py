@@ -36,12 +36,36 @@ class Post(CreatedModel):
         help_text="Выберите группу",
     )
     image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    # Размеры картинки хранятся в БД, чтобы не открывать файл ради вёрстки
+    image_width = models.PositiveIntegerField(
+        "Ширина картинки", null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        "Высота картинки", null=True, blank=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        "Число комментариев", default=0, editable=False
+    )
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Группа при загрузке: при сохранении сигналу не нужен запрос,
+        # чтобы узнать, из какой группы пост переносят
+        if "group_id" in post.__dict__:
+            post._loaded_group_id = post.group_id
+        return post
+
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"]),
+            models.Index(fields=["author", "-pub_date", "-id"]),
+            models.Index(fields=["group", "-pub_date", "-id"]),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
@@ -59,6 +83,9 @@ class Comment(CreatedModel):
         return self.text[:15]
 
     class Meta:
+        indexes = [
+            models.Index(fields=["post", "pub_date", "id"]),
+        ]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
 
@@ -77,5 +104,137 @@ class Follow(models.Model):
         return self.user
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow"
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F("author")),
+                name="no_self_follow",
+            ),
+        ]
         verbose_name = "Подписчик"
         verbose_name_plural = "Подписчики"
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    posts_count = models.PositiveIntegerField("Число постов", default=0)
+    followers_count = models.PositiveIntegerField(
+        "Число подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField("Число подписок", default=0)
+
+    def __str__(self):
+        return str(self.user)
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок.
+
+    Строки создаются при публикации поста (fan-out on write), поэтому
+    страница подписок читается одним диапазоном по индексу (user, pub_date).
+    """
+
+    # Подписчик, в ленту которого попадает пост
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    # Копии полей поста, чтобы отписка и сортировка не требовали JOIN
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    pub_date = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id}: {self.post_id}"
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=["user", "-pub_date", "-post"]),
+            models.Index(fields=["user", "author"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            ),
+        ]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+
+
+class TrendingScore(models.Model):
+    """Оценка поста в тренде, поддерживаемая при комментировании.
+
+    score — логарифм суммы весов комментариев без общего множителя
+    затухания (см. posts.trending).
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending",
+    )
+    # Копия группы поста, чтобы тренд группы читался одним индексом
+    group = models.ForeignKey(
+        Group, null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    score = models.FloatField("Оценка")
+
+    def __str__(self):
+        return f"{self.post_id}: {self.score:.3f}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-score", "-post"]),
+            models.Index(fields=["group", "-score", "-post"]),
+        ]
+        verbose_name = "Оценка в тренде"
+        verbose_name_plural = "Оценки в тренде"
+
+
+class Recommendation(models.Model):
+    """Автор, которого стоит предложить пользователю.
+
+    Строки пересчитывает пакетная команда update_recommendations, поэтому
+    страница читает готовый список одним запросом по индексу (user, rank).
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    score = models.FloatField("Оценка")
+    # Место в списке рекомендаций пользователя, начиная с нуля
+    rank = models.PositiveSmallIntegerField("Место")
+
+    def __str__(self):
+        return f"{self.user_id} → {self.author_id}"
+
+    class Meta:
+        ordering = ["rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "rank"], name="unique_recommendation_rank"
+            ),
+        ]
+        verbose_name = "Рекомендация"
+        verbose_name_plural = "Рекомендации"
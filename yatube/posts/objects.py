@@ -0,0 +1,136 @@
+"""Кэш горячих объектов: группы по slug, пользователи по username и id.
+
+Страницы группы и профиля, подписка и отписка начинаются с поиска
+объекта по адресу. Найденный объект читается из кэша, а отсутствующий
+запоминается на NEGATIVE_TIMEOUT, чтобы перебор несуществующих адресов
+не доходил до БД. Записи удаляются сигналами сохранения и удаления
+моделей (см. posts.signals), а внутри транзакции — ещё раз после её
+фиксации: до коммита параллельный запрос мог закэшировать старый объект.
+
+Объекты читаются с основной базы: значение из отстающей реплики
+пережило бы инвалидацию. Пользователь кэшируется без пароля и служебных
+полей — только то, что нужно для вывода автора.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import Http404
+
+from .models import Group, User
+
+TIMEOUT = getattr(settings, "OBJECT_CACHE_TIMEOUT", 60 * 60)
+NEGATIVE_TIMEOUT = getattr(settings, "OBJECT_CACHE_NEGATIVE_TIMEOUT", 60)
+
+USER_FIELDS = ("id", "username", "first_name", "last_name", "is_active")
+
+# Значение-заглушка: объекта нет в БД
+MISSING = "missing"
+
+
+def _digest(value):
+    # slug и username могут содержать пробелы и не-ASCII символы,
+    # недопустимые в ключах memcached
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def group_key(slug):
+    return f"object:group:{_digest(slug)}"
+
+
+def username_key(username):
+    return f"object:user:{_digest(username)}"
+
+
+def user_id_key(user_id):
+    return f"object:user_id:{user_id}"
+
+
+def _groups():
+    return Group.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _users():
+    return User.objects.using(DEFAULT_DB_ALIAS).only(*USER_FIELDS)
+
+
+def _read_through(key, load):
+    value = cache.get(key)
+    if value == MISSING:
+        return None
+    if value is None:
+        value = load()
+        if value is None:
+            cache.set(key, MISSING, NEGATIVE_TIMEOUT)
+        else:
+            cache.set(key, value, TIMEOUT)
+    return value
+
+
+def get_group(slug):
+    return _read_through(
+        group_key(slug), lambda: _groups().filter(slug=slug).first()
+    )
+
+
+def get_user(username):
+    return _read_through(
+        username_key(username),
+        lambda: _users().filter(username=username).first(),
+    )
+
+
+def get_group_or_404(slug):
+    group = get_group(slug)
+    if group is None:
+        raise Http404("Группа не найдена")
+    return group
+
+
+def get_user_or_404(username):
+    user = get_user(username)
+    if user is None:
+        raise Http404("Пользователь не найден")
+    return user
+
+
+def get_users_by_id(user_ids):
+    """Словарь id → пользователь; промахи читаются одним запросом."""
+    keys = {user_id_key(user_id): user_id for user_id in set(user_ids)}
+    cached = cache.get_many(keys)
+    users = {keys[key]: user for key, user in cached.items()}
+    missing = set(keys.values()) - set(users)
+    if missing:
+        loaded = {user.id: user for user in _users().filter(id__in=missing)}
+        cache.set_many(
+            {user_id_key(user_id): user for user_id, user in loaded.items()},
+            TIMEOUT,
+        )
+        users.update(loaded)
+    return users
+
+
+def attach_authors(posts):
+    """Подставляет авторов постов из кэша вместо JOIN с пользователями."""
+    posts = list(posts)
+    users = get_users_by_id(post.author_id for post in posts)
+    for post in posts:
+        post.author = users[post.author_id]
+
+
+def _forget(keys):
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_group(*slugs):
+    _forget([group_key(slug) for slug in slugs if slug])
+
+
+def forget_user(user_id, *usernames):
+    _forget(
+        [user_id_key(user_id)]
+        + [username_key(username) for username in usernames if username]
+    )
@@ -0,0 +1,235 @@
+"""Keyset-пагинация списков постов.
+
+Страница выбирается условием по ключу сортировки (pub_date, id) последней
+показанной записи, поэтому не нужны ни COUNT(*), ни OFFSET: стоимость
+страницы не зависит от её глубины, а новые посты не сдвигают выдачу.
+"""
+import base64
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+
+CURSOR_PARAM = "cursor"
+PAGE_PARAM = "page"
+DEFAULT_ORDERING = ("-pub_date", "-id")
+COMMENT_ORDERING = ("pub_date", "id")
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _reject_constant(name):
+    # NaN и Infinity json.loads принимает, но ключом сортировки они не бывают
+    raise InvalidCursor
+
+
+def _load(value, field):
+    """Значение курсора, приведённое к типу поля ключа сортировки."""
+    if isinstance(value, dict):
+        if not isinstance(value.get("dt"), str):
+            raise InvalidCursor
+        value = parse_datetime(value["dt"])
+        if value is None:
+            raise InvalidCursor
+    if isinstance(value, (bool, list)) or value is None:
+        raise InvalidCursor
+    try:
+        return field.to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        raise InvalidCursor
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, [_dump(value) for value in values]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, fields):
+    """Направление и значения ключа из курсора.
+
+    fields — поля модели, задающие типы значений ключа по порядку.
+    Любой испорченный или подделанный курсор даёт InvalidCursor.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        direction, values = json.loads(
+            base64.urlsafe_b64decode(padded),
+            parse_constant=_reject_constant,
+        )
+    except (ValueError, TypeError):
+        raise InvalidCursor
+    if (
+        direction not in (NEXT, PREVIOUS)
+        or not isinstance(values, list)
+        or len(values) != len(fields)
+    ):
+        raise InvalidCursor
+    return direction, [
+        _load(value, field) for value, field in zip(values, fields)
+    ]
+
+
+def _keyset_filter(fields, values):
+    """Условие «строго после ключа» для сортировки fields."""
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(fields, values):
+        lookup = "lt" if descending else "gt"
+        condition |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return condition
+
+
+class CursorPage(Sequence):
+    is_cursor = True
+
+    def __init__(
+        self, object_list, paginator, cursor, has_next, has_previous
+    ):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor or ""
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.params = QueryDict(mutable=True)
+
+    def __repr__(self):
+        return f"<Cursor page {self.cursor or 'first'}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return self.paginator.cursor_for(NEXT, self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return self.paginator.cursor_for(PREVIOUS, self.object_list[0])
+        return None
+
+    def _querystring(self, cursor):
+        params = self.params.copy()
+        params.pop(PAGE_PARAM, None)
+        params[CURSOR_PARAM] = cursor
+        return params.urlencode()
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor)
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor)
+
+    @property
+    def first_querystring(self):
+        params = self.params.copy()
+        params.pop(PAGE_PARAM, None)
+        params.pop(CURSOR_PARAM, None)
+        return params.urlencode()
+
+
+class CursorPaginator:
+    def __init__(self, object_list, per_page, ordering=DEFAULT_ORDERING):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-")) for name in ordering
+        ]
+
+    def cursor_for(self, direction, obj):
+        values = [getattr(obj, name) for name, _ in self.fields]
+        return encode_cursor(direction, values)
+
+    def _key_fields(self):
+        """Поля модели ключа сортировки, в том числе за аннотациями."""
+        query = self.object_list.query
+        return [
+            query.annotations[name].output_field
+            if name in query.annotations
+            else self.object_list.model._meta.get_field(name)
+            for name, _ in self.fields
+        ]
+
+    def _ordered(self, fields):
+        return self.object_list.order_by(
+            *[("-" if desc else "") + name for name, desc in fields]
+        )
+
+    def get_page(self, cursor=None):
+        direction, values = NEXT, None
+        if cursor:
+            try:
+                direction, values = decode_cursor(cursor, self._key_fields())
+            except InvalidCursor:
+                cursor = None
+        fields = self.fields
+        if direction == PREVIOUS:
+            fields = [(name, not desc) for name, desc in fields]
+        queryset = self._ordered(fields)
+        if values is not None:
+            queryset = queryset.filter(_keyset_filter(fields, values))
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            return CursorPage(rows, self, cursor, bool(rows), has_more)
+        return CursorPage(rows, self, cursor, has_more, bool(cursor))
+
+
+def get_page(request, queryset, per_page, ordering=DEFAULT_ORDERING):
+    """Страница списка: по курсору, либо по номеру для старых ссылок ?page=."""
+    if PAGE_PARAM in request.GET:
+        paginator = Paginator(queryset, per_page)
+        return paginator.get_page(request.GET.get(PAGE_PARAM))
+    paginator = CursorPaginator(queryset, per_page, ordering)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    page.params = request.GET.copy()
+    return page
+
+
+class CursorPaginationMixin:
+    """Подключает keyset-пагинацию к ListView."""
+
+    cursor_ordering = DEFAULT_ORDERING
+
+    def paginate_queryset(self, queryset, page_size):
+        if PAGE_PARAM in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+        page = get_page(
+            self.request, queryset, page_size, self.cursor_ordering
+        )
+        return page.paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,250 @@
+"""Рекомендации «Кого почитать» по графу подписок.
+
+Оценка автора x для пользователя u складывается из двух сигналов:
+
+* друзья друзей — число авторов u, подписанных на x;
+* общие подписчики — пользователи w, читающие тех же авторов, что и u;
+  каждый w делит вес (число общих авторов) поровну между своими
+  подписками. Авторы, у которых больше MAX_SHARED_FOLLOWERS подписчиков,
+  сходства не дают: подписка на них ничего не говорит о вкусе, а их
+  списки подписчиков раздули бы вычисление.
+
+В матричной форме, где A — матрица подписок пользователь × автор, это
+A·A и (A'·A'ᵀ)·D⁻¹A. Пакетная команда update_recommendations считает их
+разреженными матрицами SciPy блоками по CHUNK_SIZE строк, поэтому память
+ограничена блоком, а не квадратом числа пользователей. Без NumPy и SciPy
+те же оценки считаются на словарях — медленнее, но без зависимостей.
+
+Для каждого пользователя сохраняются LIMIT лучших авторов, на которых он
+ещё не подписан; страницы читают их одним запросом (for_user).
+"""
+import heapq
+import itertools
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, Recommendation
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - зависит от окружения
+    np = sparse = None
+
+LIMIT = getattr(settings, "RECOMMENDATIONS_LIMIT", 20)
+SHOWN = getattr(settings, "RECOMMENDATIONS_SHOWN", 5)
+CHUNK_SIZE = getattr(settings, "RECOMMENDATIONS_CHUNK_SIZE", 2000)
+MAX_SHARED_FOLLOWERS = getattr(
+    settings, "RECOMMENDATIONS_MAX_SHARED_FOLLOWERS", 1000
+)
+FRIENDS_WEIGHT = 1.0
+COFOLLOWERS_WEIGHT = 1.0
+BATCH_SIZE = 5000
+USERS_PER_BATCH = 500
+
+
+def is_vectorized():
+    """Доступен ли расчёт на разреженных матрицах."""
+    return sparse is not None
+
+
+def load_follows():
+    """Рёбра графа подписок: списки id подписчиков и авторов."""
+    rows = Follow.objects.values_list("user_id", "author_id").iterator(
+        chunk_size=BATCH_SIZE
+    )
+    if is_vectorized():
+        edges = np.fromiter(
+            itertools.chain.from_iterable(rows), dtype=np.int64
+        ).reshape(-1, 2)
+        return edges[:, 0], edges[:, 1]
+    users, authors = [], []
+    for user_id, author_id in rows:
+        users.append(user_id)
+        authors.append(author_id)
+    return users, authors
+
+
+def compute(
+    users,
+    authors,
+    limit=LIMIT,
+    chunk_size=CHUNK_SIZE,
+    max_shared_followers=MAX_SHARED_FOLLOWERS,
+):
+    """Пары (id пользователя, [(id автора, оценка), ...]) по убыванию.
+
+    users и authors — параллельные последовательности рёбер подписок.
+    """
+    if not len(users):
+        return iter(())
+    if is_vectorized():
+        return _compute_sparse(
+            users, authors, limit, chunk_size, max_shared_followers
+        )
+    return _compute_python(users, authors, limit, max_shared_followers)
+
+
+def _compute_sparse(users, authors, limit, chunk_size, max_shared):
+    users = np.asarray(users, dtype=np.int64)
+    authors = np.asarray(authors, dtype=np.int64)
+    size = int(max(users.max(), authors.max())) + 1
+    follows = sparse.csr_matrix(
+        (np.ones(len(users), dtype=np.float32), (users, authors)),
+        shape=(size, size),
+    )
+    out_degree = np.asarray(follows.sum(axis=1)).ravel()
+    in_degree = np.asarray(follows.sum(axis=0)).ravel()
+    # Подписки делят вес пользователя поровну: D⁻¹A
+    spread = (sparse.diags(1 / np.maximum(out_degree, 1)) @ follows).tocsr()
+    # Подписки без «знаменитостей» — по ним ищутся похожие пользователи
+    shared = (
+        follows @ sparse.diags((in_degree <= max_shared).astype(np.float32))
+    ).tocsr()
+    shared.eliminate_zeros()
+    shared_out = np.diff(shared.indptr)
+    shared_t = shared.T.tocsr()
+    active = np.flatnonzero(out_degree)
+    for start in range(0, len(active), chunk_size):
+        end = start + chunk_size
+        rows = active[start:end]
+        block = follows[rows]
+        # Ячейки (строка блока, id пользователя) — сам пользователь
+        himself = sparse.csr_matrix(
+            (
+                np.ones(len(rows), dtype=np.float32),
+                (np.arange(len(rows)), rows),
+            ),
+            shape=block.shape,
+        )
+        similar = shared[rows] @ shared_t
+        # Пользователь похож сам на себя на все свои подписки
+        similar = similar - himself.multiply(shared_out[rows][:, None])
+        similar.eliminate_zeros()
+        scores = (
+            FRIENDS_WEIGHT * (block @ follows)
+            + COFOLLOWERS_WEIGHT * (similar @ spread)
+        ).tocsr()
+        # Уже прочитанные авторы и сам пользователь не рекомендуются
+        scores = (scores - scores.multiply(block + himself)).tocsr()
+        scores.eliminate_zeros()
+        yield from _top_per_row(scores, rows, limit)
+
+
+def _top_per_row(scores, rows, limit):
+    """Лучшие limit столбцов каждой строки одной сортировкой блока."""
+    row_of = np.repeat(np.arange(len(rows)), np.diff(scores.indptr))
+    order = np.lexsort((scores.indices, -scores.data, row_of))
+    # Место ячейки в своей строке после сортировки
+    place = np.arange(len(order)) - scores.indptr[row_of[order]]
+    order = order[place < limit]
+    bounds = np.searchsorted(row_of[order], np.arange(len(rows) + 1))
+    authors = scores.indices[order].tolist()
+    values = scores.data[order].tolist()
+    for index, user_id in enumerate(rows.tolist()):
+        begin, end = bounds[index], bounds[index + 1]
+        yield user_id, list(zip(authors[begin:end], values[begin:end]))
+
+
+def _similar_users(user_id, following, followers, max_shared):
+    """Число общих авторов с каждым похожим пользователем."""
+    similar = defaultdict(int)
+    for author_id in following[user_id]:
+        readers = followers[author_id]
+        if len(readers) > max_shared:
+            continue
+        for other in readers:
+            if other != user_id:
+                similar[other] += 1
+    return similar
+
+
+def _scores(user_id, following, followers, max_shared):
+    scores = defaultdict(float)
+    for friend in following[user_id]:
+        # get(): чтение из defaultdict не должно добавлять ключи
+        for author_id in following.get(friend, ()):
+            scores[author_id] += FRIENDS_WEIGHT
+    similar = _similar_users(user_id, following, followers, max_shared)
+    for other, common in similar.items():
+        share = COFOLLOWERS_WEIGHT * common / len(following[other])
+        for author_id in following[other]:
+            scores[author_id] += share
+    return scores
+
+
+def _compute_python(users, authors, limit, max_shared):
+    following = defaultdict(set)
+    followers = defaultdict(list)
+    for user_id, author_id in zip(users, authors):
+        following[user_id].add(author_id)
+        followers[author_id].append(user_id)
+    for user_id in sorted(following):
+        mine = following[user_id]
+        scores = _scores(user_id, following, followers, max_shared)
+        candidates = (
+            (author_id, score)
+            for author_id, score in scores.items()
+            if author_id != user_id and author_id not in mine
+        )
+        yield user_id, heapq.nsmallest(
+            limit, candidates, key=lambda item: (-item[1], item[0])
+        )
+
+
+def store(results):
+    """Заменяет сохранённые рекомендации результатами compute().
+
+    Запись идёт короткими транзакциями по USERS_PER_BATCH пользователей:
+    расчёт может длиться минуты, и всё это время держать блокировку
+    записи нельзя.
+    """
+    created = 0
+    while True:
+        batch = list(itertools.islice(results, USERS_PER_BATCH))
+        if not batch:
+            break
+        with transaction.atomic():
+            Recommendation.objects.filter(
+                user_id__in=[user_id for user_id, _ in batch]
+            ).delete()
+            created += len(
+                Recommendation.objects.bulk_create(
+                    [
+                        Recommendation(
+                            user_id=user_id,
+                            author_id=author_id,
+                            score=score,
+                            rank=rank,
+                        )
+                        for user_id, top in batch
+                        for rank, (author_id, score) in enumerate(top)
+                    ],
+                    batch_size=BATCH_SIZE,
+                )
+            )
+    # Пользователи, отписавшиеся ото всех, в results не попадают
+    Recommendation.objects.exclude(
+        user_id__in=Follow.objects.values("user_id")
+    ).delete()
+    return created
+
+
+def rebuild(limit=LIMIT, chunk_size=CHUNK_SIZE):
+    """Пересчитывает рекомендации всех пользователей."""
+    users, authors = load_follows()
+    return store(iter(compute(users, authors, limit, chunk_size)))
+
+
+def for_user(user, limit=SHOWN):
+    """Рекомендованные пользователю авторы одним запросом."""
+    if not user.is_authenticated:
+        return []
+    return [
+        recommendation.author
+        for recommendation in Recommendation.objects.filter(user=user)
+        .select_related("author")
+        .order_by("rank")[:limit]
+    ]
@@ -0,0 +1,43 @@
+"""Области кэша для страниц постов (см. core.generations)."""
+
+ALL_POSTS = "posts"
+
+
+def group_scope(group_id):
+    return f"group:{group_id}"
+
+
+def profile_scope(user_id):
+    return f"profile:{user_id}"
+
+
+def stats_scope(user_id):
+    """Счётчики постов и подписок пользователя."""
+    return f"stats:{user_id}"
+
+
+def post_scope(post_id):
+    """Сам пост и его комментарии."""
+    return f"post:{post_id}"
+
+
+def comments_scope(scope):
+    """Число комментариев постов области: меняется каждым комментарием."""
+    return f"comments:{scope}"
+
+
+def comment_scopes(post):
+    """Области, которые затрагивает комментарий к посту."""
+    scopes = {ALL_POSTS, profile_scope(post.author_id)}
+    if post.group_id is not None:
+        scopes.add(group_scope(post.group_id))
+    return {post_scope(post.id)} | {comments_scope(scope) for scope in scopes}
+
+
+def post_scopes(post, old_group_id=None):
+    """Области, которые затрагивает создание, изменение или удаление поста."""
+    scopes = {ALL_POSTS, profile_scope(post.author_id), post_scope(post.id)}
+    for group_id in (post.group_id, old_group_id):
+        if group_id is not None:
+            scopes.add(group_scope(group_id))
+    return scopes
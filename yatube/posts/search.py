@@ -0,0 +1,178 @@
+"""Полнотекстовый поиск по постам на индексе SQLite FTS5.
+
+Индекс posts_post_fts создаётся миграцией 0011 и хранит текст поста
+(rowid совпадает с id поста) и неиндексируемые author_id/group_id для
+фильтрации. Он обновляется сигналами при создании, изменении и удалении
+поста, а команда rebuild_search_index строит его заново.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, IntegerField
+
+from .models import Post
+from .paginators import (
+    NEXT,
+    PREVIOUS,
+    CursorPage,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+)
+
+TABLE = "posts_post_fts"
+# Типы ключа (rank, rowid) для проверки курсора
+KEY_FIELDS = (FloatField(), IntegerField())
+
+
+def is_supported():
+    return connection.vendor == "sqlite"
+
+
+def build_query(text):
+    """Запрос FTS5 из пользовательского ввода: все слова обязательны.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 во вводе
+    не интерпретируются; последнее слово ищется как префикс.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def index_posts(posts, replace=True):
+    """Добавляет или обновляет посты в индексе.
+
+    replace=False — только для новых постов: их строк в индексе ещё нет.
+    """
+    if not is_supported():
+        return
+    rows = [
+        (post.id, post.text, post.author_id, post.group_id) for post in posts
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if replace:
+            cursor.executemany(
+                f"DELETE FROM {TABLE} WHERE rowid = %s",
+                [row[:1] for row in rows],
+            )
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, text, author_id, group_id) "
+            "VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def remove_posts(post_ids):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {TABLE} WHERE rowid = %s",
+            [(post_id,) for post_id in post_ids],
+        )
+
+
+def clear_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+
+
+def optimize_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+
+
+def _filters(query, group_id, author_id):
+    conditions = [f"{TABLE} MATCH %s"]
+    params = [query]
+    if group_id is not None:
+        conditions.append("group_id = %s")
+        params.append(group_id)
+    if author_id is not None:
+        conditions.append("author_id = %s")
+        params.append(author_id)
+    return conditions, params
+
+
+def matching_ids(text, limit, group_id=None, author_id=None):
+    """id лучших по релевантности постов для запроса."""
+    query = build_query(text)
+    if not query or not is_supported():
+        return []
+    conditions, params = _filters(query, group_id, author_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {TABLE} WHERE {' AND '.join(conditions)} "
+            "ORDER BY rank LIMIT %s",
+            params + [limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SearchPaginator:
+    """Курсорная пагинация результатов поиска по ключу (rank, id)."""
+
+    def __init__(self, text, per_page, group_id=None, author_id=None):
+        self.query = build_query(text)
+        self.per_page = per_page
+        self.group_id = group_id
+        self.author_id = author_id
+
+    def cursor_for(self, direction, post):
+        return encode_cursor(direction, [post.search_rank, post.id])
+
+    def _fetch(self, direction, values):
+        conditions, params = _filters(
+            self.query, self.group_id, self.author_id
+        )
+        order = "ASC"
+        if values is not None:
+            sign = ">" if direction == NEXT else "<"
+            conditions.append(
+                f"(rank {sign} %s OR (rank = %s AND rowid {sign} %s))"
+            )
+            params += [values[0], values[0], values[1]]
+        if direction == PREVIOUS:
+            order = "DESC"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, rank FROM {TABLE} "
+                f"WHERE {' AND '.join(conditions)} "
+                f"ORDER BY rank {order}, rowid {order} LIMIT %s",
+                params + [self.per_page + 1],
+            )
+            return cursor.fetchall()
+
+    def get_page(self, cursor=None):
+        direction, values = NEXT, None
+        if cursor:
+            try:
+                direction, values = decode_cursor(cursor, KEY_FIELDS)
+            except InvalidCursor:
+                cursor = None
+        rows = []
+        if self.query and is_supported():
+            rows = self._fetch(direction, values)
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+        posts = Post.objects.select_related("author", "group").in_bulk(
+            [post_id for post_id, _ in rows]
+        )
+        object_list = []
+        for post_id, rank in rows:
+            if post_id in posts:
+                posts[post_id].search_rank = rank
+                object_list.append(posts[post_id])
+        if direction == PREVIOUS:
+            return CursorPage(
+                object_list, self, cursor, bool(object_list), has_more
+            )
+        return CursorPage(object_list, self, cursor, has_more, bool(cursor))
@@ -0,0 +1,210 @@
+from contextvars import ContextVar
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.generations import bump
+
+from . import counters, objects, search, timeline, trending
+from .models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    Recommendation,
+    User,
+    UserStats,
+)
+from .scopes import (
+    ALL_POSTS,
+    comment_scopes,
+    group_scope,
+    post_scopes,
+    profile_scope,
+    stats_scope,
+)
+
+# id удаляемых сейчас постов: их комментарии удаляются каскадом
+_deleting_posts = ContextVar("deleting_posts", default=frozenset())
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw=False, **kwargs):
+    instance._old_username = None
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and "username" not in update_fields:
+        return
+    if instance.pk and not raw:
+        instance._old_username = (
+            User.objects.filter(pk=instance.pk)
+            .values_list("username", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    if kwargs.get("update_fields") == frozenset(["last_login"]):
+        return
+    # Удаляется и отрицательная запись: новый пользователь виден сразу
+    objects.forget_user(
+        instance.id,
+        instance.username,
+        getattr(instance, "_old_username", None),
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif kwargs.get("update_fields") != frozenset(["last_login"]):
+        # Имя автора выводится в карточках постов
+        group_ids = (
+            Post.objects.filter(author=instance, group__isnull=False)
+            .order_by()
+            .values_list("group_id", flat=True)
+            .distinct()
+        )
+        bump(
+            ALL_POSTS,
+            profile_scope(instance.id),
+            *[group_scope(group_id) for group_id in group_ids],
+        )
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, raw=False, **kwargs):
+    instance._old_slug = None
+    if instance.pk and not raw:
+        instance._old_slug = (
+            Group.objects.filter(pk=instance.pk)
+            .values_list("slug", flat=True)
+            .first()
+        )
+
+
+def _group_author_scopes(group):
+    """Профили авторов группы: в их карточках постов есть её ссылка."""
+    author_ids = (
+        Post.objects.filter(group_id=group.id)
+        .order_by()
+        .values_list("author_id", flat=True)
+        .distinct()
+    )
+    return [profile_scope(author_id) for author_id in author_ids]
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    objects.forget_group(instance.slug, getattr(instance, "_old_slug", None))
+    if not raw:
+        bump(ALL_POSTS, group_scope(instance.id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        bump(*_group_author_scopes(instance))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Посты останутся без группы через UPDATE, без сигналов post_save
+    bump(*_group_author_scopes(instance))
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    instance._old_group_id = None
+    if instance.pk and not raw and hasattr(instance, "_loaded_group_id"):
+        instance._old_group_id = instance._loaded_group_id
+    elif instance.pk and not raw:
+        instance._old_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .order_by()
+            .values_list("group_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    bump(*post_scopes(instance, getattr(instance, "_old_group_id", None)))
+    search.index_posts([instance], replace=not created)
+    if created:
+        counters.change_user_stats(instance.author_id, posts_count=1)
+        bump(stats_scope(instance.author_id))
+        timeline.fan_out(instance)
+    elif instance.group_id != getattr(instance, "_old_group_id", None):
+        trending.move_post(instance)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Комментарии поста уходят вместе с ним: их счётчик не нужен, а кэш
+    # сбрасывает post_deleted сразу за все, а не comment_deleted на каждый
+    _deleting_posts.set(_deleting_posts.get() | {instance.id})
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts.set(_deleting_posts.get() - {instance.id})
+    bump(
+        *post_scopes(instance),
+        *comment_scopes(instance),
+        stats_scope(instance.author_id),
+    )
+    counters.change_user_stats(instance.author_id, posts_count=-1)
+    search.remove_posts([instance.id])
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    bump(*comment_scopes(instance.post))
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+        trending.record_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts.get():
+        return
+    bump(*comment_scopes(instance.post))
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_stats(instance.user_id, following_count=1)
+        counters.change_user_stats(instance.author_id, followers_count=1)
+        bump(stats_scope(instance.user_id), stats_scope(instance.author_id))
+        timeline.backfill(instance.user_id, instance.author_id)
+        # Рекомендация выполнена: до пересчёта её больше не показываем
+        Recommendation.objects.filter(
+            user_id=instance.user_id, author_id=instance.author_id
+        ).delete()
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.user_id, following_count=-1)
+    counters.change_user_stats(instance.author_id, followers_count=-1)
+    bump(stats_scope(instance.user_id), stats_scope(instance.author_id))
+    timeline.trim(instance.user_id, instance.author_id)
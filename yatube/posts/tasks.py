@@ -0,0 +1,49 @@
+"""Фоновые задачи постов (очередь core.tasks)."""
+from django.conf import settings
+
+from core.generations import bump
+from core.tasks import task
+
+from . import images, thumbnails
+from .models import Post
+from .scopes import post_scopes
+
+
+@task(priority=5)
+def process_image(post_id, image_name):
+    """Нормализует загруженную картинку поста и строит её миниатюры.
+
+    Если пост удалён или картинку успели заменить, задача ничего не
+    делает: новую картинку обработает своя задача.
+    """
+    post = Post.objects.filter(id=post_id, image=image_name).first()
+    if post is None:
+        return
+    field = post.image.field
+    with post.image.open("rb") as original:
+        normalized, (width, height) = images.normalize(original)
+        name = image_name
+        if normalized is not original:
+            name = field.storage.save(
+                field.generate_filename(post, normalized.name), normalized
+            )
+    updated = Post.objects.filter(id=post_id, image=image_name).update(
+        image=name, image_width=width, image_height=height
+    )
+    if name != image_name:
+        # Лишним остаётся оригинал или, если картинку заменили, результат
+        field.storage.delete(image_name if updated else name)
+    if not updated:
+        return
+    # UPDATE без сигналов: фрагменты со старой картинкой устарели
+    bump(*post_scopes(post))
+    if getattr(settings, "THUMBNAIL_PREGENERATE", True):
+        thumbnails.generate_many([name])
+
+
+def schedule_image(post):
+    """Ставит обработку новой картинки поста в очередь."""
+    if post.image:
+        process_image.enqueue(
+            post.id, post.image.name, key=f"image:{post.image.name}"
+        )
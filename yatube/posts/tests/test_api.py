@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_budget import assert_max_queries
+from posts.api import PAGE_SIZE
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="auth", first_name="Лев", last_name="Толстой"
+        )
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f"Пост {i}")
+            for i in range(PAGE_SIZE + 5)
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Тестовый пост"
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text="Комментарий"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_return_posts(self):
+        """Ленты отдают посты страницами по курсору."""
+        urls = (
+            reverse("posts:api_index"),
+            reverse("posts:api_group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:api_profile_posts", kwargs={"username": "auth"}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data["results"]), PAGE_SIZE)
+                self.assertEqual(data["results"][0]["text"], "Тестовый пост")
+                self.assertEqual(
+                    data["results"][0]["author_name"], "Лев Толстой"
+                )
+                self.assertIsNone(data["previous"])
+                data = self.client.get(data["next"]).json()
+                self.assertEqual(len(data["results"]), 6)
+                self.assertIsNone(data["next"])
+
+    def test_field_selection(self):
+        """Параметр fields оставляет в ответе только нужные поля."""
+        url = reverse(
+            "posts:api_post_detail", kwargs={"post_id": self.post.id}
+        )
+        response = self.client.get(url, {"fields": "id,text"})
+        self.assertEqual(set(response.json()), {"id", "text"})
+        response = self.client.get(url, {"fields": "id,password"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_modified_without_reading_posts(self):
+        """Повторный запрос с тем же ETag получает 304 без запросов к БД."""
+        url = reverse("posts:api_index")
+        etag = self.client.get(url)["ETag"]
+        with assert_max_queries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_data(self):
+        """Изменение поста или комментариев меняет ETag."""
+        urls = (
+            reverse("posts:api_index"),
+            reverse("posts:api_post_detail", kwargs={"post_id": self.post.id}),
+            reverse(
+                "posts:api_post_comments", kwargs={"post_id": self.post.id}
+            ),
+        )
+        etags = [self.client.get(url)["ETag"] for url in urls]
+        Comment.objects.create(
+            post=self.post, author=self.author, text="Новый комментарий"
+        )
+        post = Post.objects.get(id=self.post.id)
+        post.text = "Изменённый пост"
+        post.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_feed_etag_with_counts(self):
+        """Комментарий меняет ETag лент, в которых есть comments_count."""
+        urls = (
+            reverse("posts:api_index"),
+            reverse("posts:api_group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:api_profile_posts", kwargs={"username": "auth"}),
+        )
+        counted = [self.client.get(url)["ETag"] for url in urls]
+        uncounted = [
+            self.client.get(url, {"fields": "id,text"})["ETag"]
+            for url in urls
+        ]
+        Comment.objects.create(
+            post=self.post, author=self.author, text="Новый комментарий"
+        )
+        for url, etag, plain_etag in zip(urls, counted, uncounted):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()["results"][0]["comments_count"], 2
+                )
+                response = self.client.get(
+                    url, {"fields": "id,text"}, HTTP_IF_NONE_MATCH=plain_etag
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_comments(self):
+        """Комментарии поста отдаются по возрастанию даты."""
+        Comment.objects.create(
+            post=self.post, author=self.author, text="Второй комментарий"
+        )
+        url = reverse(
+            "posts:api_post_comments", kwargs={"post_id": self.post.id}
+        )
+        data = self.client.get(url).json()
+        texts = [comment["text"] for comment in data["results"]]
+        self.assertEqual(texts, ["Комментарий", "Второй комментарий"])
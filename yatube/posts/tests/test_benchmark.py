@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from posts.management.commands.benchmark_urls import iter_routes
+from posts.models import Comment, Follow, Post, TimelineEntry, UserStats
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            "generate_data",
+            users=30,
+            posts=200,
+            groups=3,
+            follows=5,
+            comments=300,
+            images=1,
+            stdout=StringIO(),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_data(self):
+        """Данные созданы вместе со счётчиками и лентами подписок."""
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertFalse(Follow.objects.filter(user=F("author")).exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(UserStats.objects.count(), 30)
+        comments = Comment.objects.select_related("post")
+        for comment in comments[:50]:
+            self.assertGreaterEqual(comment.pub_date, comment.post.pub_date)
+
+    def test_benchmark_covers_every_route(self):
+        """Бенчмарк замеряет каждый маршрут и сравнивает с базовым уровнем."""
+        path = os.path.join(TEMP_MEDIA_ROOT, "baseline.json")
+        call_command(
+            "benchmark_urls",
+            iterations=1,
+            warmup=0,
+            save=path,
+            stdout=StringIO(),
+        )
+        with open(path) as file:
+            results = json.load(file)["routes"]
+        self.assertEqual(set(results), {name for name, _ in iter_routes()})
+        for name, result in results.items():
+            with self.subTest(route=name):
+                self.assertLess(result["status"], 500)
+        call_command(
+            "benchmark_urls",
+            iterations=1,
+            warmup=0,
+            compare=path,
+            tolerance=100,
+            route=["posts:index"],
+            stdout=StringIO(),
+        )
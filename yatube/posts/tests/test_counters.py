@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_budget import count_queries
+
+from posts.models import Comment, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="auth")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(author=cls.author, text="Тестовый пост")
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counter_follows_create_and_delete(self):
+        """Счётчик постов меняется при создании и удалении поста."""
+        self.reader_client.post(
+            reverse("posts:post_create"), {"text": "Новый пост"}
+        )
+        self.assertEqual(self.stats(self.reader).posts_count, 1)
+        Post.objects.filter(author=self.reader).get().delete()
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев поста меняется при добавлении и удалении."""
+        self.reader_client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.id}),
+            {"text": "Комментарий"},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Comment.objects.get().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def delete_post_queries(self, comments):
+        post = Post.objects.create(author=self.author, text="Удаляемый пост")
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.reader, text=f"Комментарий {i}")
+            for i in range(comments)
+        )
+        with count_queries() as counter:
+            post.delete()
+        return counter.count
+
+    def test_post_delete_does_not_touch_each_comment(self):
+        """Удаление поста не обрабатывает его комментарии по одному."""
+        self.assertEqual(
+            self.delete_post_queries(1), self.delete_post_queries(100)
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики обоих пользователей."""
+        self.reader_client.get(
+            reverse("posts:profile_follow", kwargs={"username": "auth"})
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.reader_client.get(
+            reverse("posts:profile_unfollow", kwargs={"username": "auth"})
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount_stats исправляет разошедшиеся счётчики."""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий"
+        )
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        Post.objects.filter(id=self.post.id).update(comments_count=7)
+        call_command("recount_stats", chunk_size=1, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.follows import followed_author_ids, is_following
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username="reader")
+        cls.followed = User.objects.create_user(username="followed")
+        cls.other = User.objects.create_user(username="other")
+        Follow.objects.create(user=cls.reader, author=cls.followed)
+        for author in (cls.followed, cls.other, cls.reader):
+            Post.objects.create(author=author, text="Тестовый пост")
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_is_following(self):
+        """Проверка подписки учитывает анонимов и самого себя."""
+        self.assertTrue(is_following(self.reader, self.followed))
+        self.assertFalse(is_following(self.reader, self.other))
+        self.assertFalse(is_following(self.reader, self.reader))
+        self.assertFalse(is_following(AnonymousUser(), self.followed))
+
+    def test_followed_author_ids_uses_one_query(self):
+        """Подписки на всех авторов страницы выясняются одним запросом."""
+        ids = [self.followed.id, self.other.id, self.reader.id]
+        with self.assertNumQueries(1):
+            followed = followed_author_ids(self.reader, ids)
+        self.assertEqual(followed, {self.followed.id})
+
+    def test_index_shows_follow_buttons(self):
+        """На карточках главной страницы кнопки отражают подписки."""
+        response = self.reader_client.get(reverse("posts:index"))
+        self.assertEqual(response.context["followed_ids"], {self.followed.id})
+        self.assertContains(
+            response,
+            reverse("posts:profile_unfollow", kwargs={"username": "followed"}),
+        )
+        self.assertContains(
+            response,
+            reverse("posts:profile_follow", kwargs={"username": "other"}),
+        )
+        self.assertNotContains(
+            response,
+            reverse("posts:profile_follow", kwargs={"username": "reader"}),
+        )
+
+    def test_cached_page_follows_subscription_changes(self):
+        """Кэш фрагмента не отдаёт устаревшее состояние подписки."""
+        url = reverse("posts:index")
+        follow_url = reverse(
+            "posts:profile_follow", kwargs={"username": "other"}
+        )
+        self.assertContains(self.reader_client.get(url), follow_url)
+        Follow.objects.create(user=self.reader, author=self.other)
+        self.assertNotContains(self.reader_client.get(url), follow_url)
+        anonymous = self.client.get(url)
+        self.assertNotContains(anonymous, follow_url)
@@ -1,3 +1,4 @@
+import io
 import shutil
 import tempfile
 
@@ -6,10 +7,15 @@ from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
+
+from core.tasks import run_pending
+from posts import images
 from posts.models import Post, Group, Comment
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
+EXTENSION = images.EXTENSIONS[images.FORMAT]
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -54,13 +60,17 @@ class PostFormTests(TestCase):
             "image": uploaded,
         }
         response = self.author_client.post(
-            reverse("posts:post_create"), data=form_data, follow=True
+            reverse("posts:post_create"), data=form_data
         )
+        # Миниатюры строит задача, а не первая страница после загрузки
+        run_pending()
         self.assertTrue(
             Post.objects.filter(
                 text="Тестовый новый пост",
                 group=self.group.id,
-                image="posts/small.gif",
+                image="posts/small" + EXTENSION,
+                image_width=2,
+                image_height=1,
             ).exists()
         )
         self.assertRedirects(
@@ -90,13 +100,13 @@ class PostFormTests(TestCase):
         response = self.author_client.post(
             reverse("posts:post_edit", kwargs={"post_id": "1"}),
             data=form_data,
-            follow=True,
         )
+        run_pending()
         self.assertTrue(
             Post.objects.filter(
                 text="Редактированный пост",
                 group=self.group.id,
-                image="posts/small_1.gif",
+                image="posts/small_1" + EXTENSION,
             ).exists()
         )
         self.assertRedirects(
@@ -104,6 +114,36 @@ class PostFormTests(TestCase):
         )
         self.assertEqual(Post.objects.count(), posts_count)
 
+    def test_post_create_normalizes_image(self):
+        """Большая картинка уменьшается, поворачивается и теряет EXIF."""
+        exif = Image.Exif()
+        # Ориентация 6: снимок повёрнут на 90° по часовой стрелке
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        Image.new("RGB", (4000, 3000), "red").save(
+            buffer, "JPEG", exif=exif.tobytes()
+        )
+        uploaded = SimpleUploadedFile(
+            name="camera.jpg",
+            content=buffer.getvalue(),
+            content_type="image/jpeg",
+        )
+        self.author_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Фото с камеры", "image": uploaded},
+        )
+        self.assertEqual(run_pending(), 1)
+        post = Post.objects.get(text="Фото с камеры")
+        max_size = images.MAX_SIZE
+        expected = (max_size * 3 // 4, max_size)
+        # Для JPEG хранилище добавит суффикс: оригинал занимает имя
+        self.assertTrue(post.image.name.startswith("posts/camera"))
+        self.assertTrue(post.image.name.endswith(EXTENSION))
+        self.assertEqual((post.image_width, post.image_height), expected)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, expected)
+            self.assertFalse(image.getexif())
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class CommentFormTests(TestCase):
@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from posts import images
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportContentTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        with open(os.path.join(self.source, "small.gif"), "wb") as file:
+            file.write(SMALL_GIF)
+
+    def tearDown(self):
+        shutil.rmtree(self.source, ignore_errors=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def write_jsonl(self, name, records):
+        return self.write(
+            name, "".join(json.dumps(record) + "\n" for record in records)
+        )
+
+    def load(self, kind, path, **options):
+        options.setdefault("batch_size", 2)
+        options.setdefault("skip_derived", True)
+        stdout = StringIO()
+        call_command(
+            "import_content",
+            kind,
+            path,
+            images_dir=self.source,
+            stdout=stdout,
+            stderr=StringIO(),
+            **options,
+        )
+        return stdout.getvalue()
+
+    def stored_files(self):
+        return set(os.listdir(os.path.join(TEMP_MEDIA_ROOT, "posts")))
+
+    def test_import_all_kinds(self):
+        """Группы, посты, комментарии и подписки загружаются из файлов."""
+        self.load(
+            "groups",
+            self.write("groups.csv", "slug,title\ncats,Коты\ndogs,Собаки\n"),
+        )
+        posts = self.write_jsonl(
+            "posts.jsonl",
+            [
+                {
+                    "id": 10,
+                    "author": "old_author",
+                    "text": "Пост с картинкой",
+                    "group": "cats",
+                    "image": "small.gif",
+                    "pub_date": "2020-01-01T10:00:00",
+                },
+                {"id": 11, "author": "reader", "text": "Пост без группы"},
+                {"id": 12, "author": "old_author", "text": "Ещё пост"},
+            ],
+        )
+        self.load("posts", posts)
+        comments = self.write_jsonl(
+            "comments.jsonl",
+            [
+                {"id": 1, "post": 10, "author": "reader", "text": "Класс"},
+                {"id": 2, "post": 999, "author": "reader", "text": "Сирота"},
+            ],
+        )
+        self.load("comments", comments)
+        follows = self.write(
+            "follows.csv",
+            "user,author\nreader,old_author\nreader,reader\n",
+        )
+        self.load("follows", follows, skip_derived=False)
+
+        self.assertEqual(Group.objects.count(), 2)
+        post = Post.objects.get(id=10)
+        self.assertEqual(post.author.username, "old_author")
+        self.assertEqual(post.group.slug, "cats")
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertTrue(post.image.name.startswith("posts/"))
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertEqual(
+            list(Comment.objects.values_list("id", flat=True)), [1]
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+        reader = User.objects.get(username="reader")
+        self.assertFalse(reader.has_usable_password())
+        stats = UserStats.objects.get(user__username="old_author")
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(Post.objects.get(id=10).comments_count, 1)
+        self.assertFalse(os.path.exists(posts + ".checkpoint"))
+
+    def test_import_resumes_from_checkpoint(self):
+        """Загрузка продолжается с контрольной точки без дублей."""
+        records = [
+            {"id": number, "author": "auth", "text": f"Пост {number}"}
+            for number in range(1, 6)
+        ]
+        path = self.write_jsonl("posts.jsonl", records)
+        with open(path, "rb") as file:
+            file.readline()
+            file.readline()
+            offset = file.tell()
+        with open(path + ".checkpoint", "w") as file:
+            json.dump({"offset": offset, "records": 2}, file)
+        output = self.load("posts", path)
+        self.assertIn("Загружено записей: 3", output)
+        self.assertEqual(
+            list(Post.objects.order_by("id").values_list("id", flat=True)),
+            [3, 4, 5],
+        )
+        output = self.load("posts", path, restart=True)
+        self.assertIn("Загружено записей: 2", output)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_images_are_not_copied_again(self):
+        """Повторная загрузка не копирует уже сохранённые картинки."""
+        shutil.copy(
+            os.path.join(self.source, "small.gif"),
+            os.path.join(self.source, "copy.gif"),
+        )
+        path = self.write_jsonl(
+            "posts.jsonl",
+            [
+                {"id": 1, "author": "auth", "text": "1", "image": "small.gif"},
+                {"id": 2, "author": "auth", "text": "2", "image": "copy.gif"},
+            ],
+        )
+        self.load("posts", path)
+        first, second = Post.objects.order_by("id")
+        self.assertEqual(first.image.name, second.image.name)
+        files = self.stored_files()
+        Post.objects.filter(id=2).delete()
+        self.load("posts", path, restart=True)
+        self.assertEqual(self.stored_files(), files)
+        self.assertEqual(Post.objects.get(id=2).image.name, first.image.name)
+
+    def test_imported_images_are_normalized(self):
+        """Загруженные картинки уменьшаются и перекодируются."""
+        Image.new("RGB", (images.MAX_SIZE * 2, 10)).save(
+            os.path.join(self.source, "wide.png")
+        )
+        path = self.write_jsonl(
+            "posts.jsonl",
+            [{"id": 1, "author": "auth", "text": "1", "image": "wide.png"}],
+        )
+        self.load("posts", path)
+        post = Post.objects.get()
+        self.assertEqual(post.image_width, images.MAX_SIZE)
+        self.assertEqual(
+            os.path.splitext(post.image.name)[1],
+            images.EXTENSIONS[images.FORMAT],
+        )
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (images.MAX_SIZE, 5))
+
+    def test_same_image_names_are_not_merged(self):
+        """Одноимённые картинки из разных каталогов остаются разными."""
+        for folder, size in (("a", (10, 20)), ("b", (30, 40))):
+            os.mkdir(os.path.join(self.source, folder))
+            Image.new("RGB", size).save(
+                os.path.join(self.source, folder, "1.jpg")
+            )
+        path = self.write_jsonl(
+            "posts.jsonl",
+            [
+                {"id": 1, "author": "auth", "text": "1", "image": "a/1.jpg"},
+                {"id": 2, "author": "auth", "text": "2", "image": "b/1.jpg"},
+                {"id": 3, "author": "auth", "text": "3", "image": "a/1.jpg"},
+            ],
+        )
+        self.load("posts", path)
+        first, second, third = Post.objects.order_by("id")
+        self.assertNotEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.name, third.image.name)
+        self.assertEqual((first.image_width, first.image_height), (10, 20))
+        self.assertEqual((second.image_width, second.image_height), (30, 40))
+        with Image.open(second.image.path) as image:
+            self.assertEqual(image.size, (30, 40))
+
+    def test_invalid_record(self):
+        """Запись без обязательного поля останавливает загрузку."""
+        path = self.write_jsonl("posts.jsonl", [{"id": 1, "text": "Пост"}])
+        with self.assertRaises(CommandError):
+            self.load("posts", path)
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,82 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный проход по таблице без индекса
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+# Сортировка результата (в том числе частичная) во временном B-дереве
+SORT = "USE TEMP B-TREE"
+
+
+class QueryPlanTests(TestCase):
+    """Запросы списков постов идут по индексам, без сканов и сортировок."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="auth")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f"Пост {i}", group=cls.group
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text="Комментарий"
+        )
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.reader_client.get(url)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT") or "posts_" not in sql:
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                plans[sql] = [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def assert_uses_indexes(self, url):
+        plans = self.query_plans(url)
+        self.assertTrue(plans)
+        for sql, plan in plans.items():
+            with self.subTest(url=url, sql=sql):
+                for step in plan:
+                    self.assertIsNone(FULL_SCAN.match(step), plan)
+                    self.assertNotIn(SORT, step, plan)
+
+    def test_list_views_use_indexes(self):
+        """Первые и следующие страницы списков читаются по индексам."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:profile", kwargs={"username": "auth"}),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            self.assert_uses_indexes(url)
+            page = self.reader_client.get(url).context["page_obj"]
+            self.assert_uses_indexes(url + "?" + page.next_querystring)
+
+    def test_post_detail_uses_indexes(self):
+        """Страница поста и её комментарии читаются по индексам."""
+        self.assert_uses_indexes(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.id})
+        )
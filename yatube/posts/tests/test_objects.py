@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.conf import settings
+from django.db import transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import objects
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Тестовый пост"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_group_read_through(self):
+        """Группа читается из БД один раз, затем из кэша."""
+        with self.assertNumQueries(1):
+            objects.get_group("test-slug")
+        with self.assertNumQueries(0):
+            group = objects.get_group("test-slug")
+        self.assertEqual(group, self.group)
+        self.assertEqual(group.title, "Тестовая группа")
+
+    def test_user_cached_without_password(self):
+        """Пользователь кэшируется без пароля."""
+        objects.get_user("author")
+        with self.assertNumQueries(0):
+            user = objects.get_user("author")
+        self.assertEqual(user.get_full_name(), "Лев Толстой")
+        self.assertIn("password", user.get_deferred_fields())
+
+    def test_missing_objects_are_cached(self):
+        """Отсутствие объекта запоминается и даёт 404 без запросов."""
+        objects.get_group("unknown")
+        with self.assertNumQueries(0):
+            self.assertIsNone(objects.get_group("unknown"))
+            with self.assertRaises(Http404):
+                objects.get_group_or_404("unknown")
+
+    def test_created_object_replaces_negative_entry(self):
+        """Созданный объект сразу виден вместо закэшированного 404."""
+        self.assertIsNone(objects.get_user("newcomer"))
+        self.assertIsNone(objects.get_group("new-slug"))
+        User.objects.create_user(username="newcomer")
+        Group.objects.create(title="Новая", slug="new-slug")
+        self.assertIsNotNone(objects.get_user("newcomer"))
+        self.assertIsNotNone(objects.get_group("new-slug"))
+
+    def test_rename_invalidates_old_and_new_keys(self):
+        """Переименование удаляет записи старого и нового значения."""
+        objects.get_group("test-slug")
+        objects.get_user("author")
+        objects.get_users_by_id([self.author.id])
+        # Объекты из setUpTestData общие для тестов: меняем копии
+        group = Group.objects.get(id=self.group.id)
+        group.slug = "renamed"
+        group.save()
+        author = User.objects.get(id=self.author.id)
+        author.username = "writer"
+        author.save()
+        self.assertIsNone(objects.get_group("test-slug"))
+        self.assertEqual(objects.get_group("renamed").slug, "renamed")
+        self.assertIsNone(objects.get_user("author"))
+        self.assertEqual(objects.get_user("writer").username, "writer")
+        users = objects.get_users_by_id([self.author.id])
+        self.assertEqual(users[self.author.id].username, "writer")
+
+    def test_delete_invalidates(self):
+        """Удалённая группа перестаёт находиться."""
+        objects.get_group("test-slug")
+        Group.objects.get(id=self.group.id).delete()
+        self.assertIsNone(objects.get_group("test-slug"))
+
+    def test_change_in_transaction_forgets_again_on_commit(self):
+        """После коммита запись удаляется снова: её мог вернуть читатель."""
+        callbacks = []
+        with mock.patch.object(transaction, "on_commit", callbacks.append):
+            with transaction.atomic():
+                author = User.objects.get(id=self.author.id)
+                author.first_name = "Алексей"
+                author.save()
+                # Параллельный запрос ещё видит данные до коммита
+                cache.set(objects.username_key("author"), self.author)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(objects.get_user("author").first_name, "Алексей")
+
+    def test_attach_authors_uses_one_query(self):
+        """Авторы страницы читаются одним запросом, затем из кэша."""
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            objects.attach_authors(posts)
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            objects.attach_authors(posts)
+        self.assertEqual(posts[0].author.username, "author")
+
+    @override_settings(
+        MIDDLEWARE=[
+            name
+            for name in settings.MIDDLEWARE
+            if name != "core.middleware.PageCacheMiddleware"
+        ]
+    )
+    def test_profile_page_uses_cached_author(self):
+        """Повторный показ профиля не ищет автора в БД."""
+        client = Client()
+        url = reverse("posts:profile", kwargs={"username": "author"})
+        client.get(url)
+        with self.assertNumQueries(2):
+            response = client.get(url)
+        self.assertEqual(response.context["author"], self.author)
+        self.assertContains(response, "Лев Толстой")
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_init
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core import page_cache
+from core.generations import bump
+from posts.models import Comment, Follow, Group, Post
+from posts.scopes import profile_scope
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа", slug="other", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Тестовый пост"
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.reader, group=cls.other_group, text="Другой пост"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def url(self, name, **kwargs):
+        return reverse(f"posts:{name}", kwargs=kwargs)
+
+    def status(self, url):
+        return self.client.get(url).get(page_cache.STATUS_HEADER)
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторный запрос анонима отдаётся из кэша без запросов к БД."""
+        url = self.url("post_detail", post_id=self.post.id)
+        first = self.client.get(url)
+        self.assertEqual(first[page_cache.STATUS_HEADER], "miss")
+        self.assertEqual(
+            set(first[page_cache.SURROGATE_KEY_HEADER].split()),
+            {
+                f"post:{self.post.id}",
+                f"profile:{self.author.id}",
+                f"stats:{self.author.id}",
+                f"group:{self.group.id}",
+            },
+        )
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second[page_cache.STATUS_HEADER], "hit")
+        self.assertEqual(second.content, first.content)
+
+    def test_change_during_render_purges_post_page(self):
+        """Смена автора во время выборки поста не остаётся в кэше."""
+        url = self.url("post_detail", post_id=self.post.id)
+
+        def rename_author(instance, **kwargs):
+            post_init.disconnect(rename_author, sender=Post)
+            bump(profile_scope(self.author.id))
+
+        post_init.connect(rename_author, sender=Post)
+        self.addCleanup(post_init.disconnect, rename_author, sender=Post)
+        self.assertEqual(self.status(url), "miss")
+        self.assertEqual(self.status(url), "miss")
+        self.assertEqual(self.status(url), "hit")
+
+    def test_authenticated_users_bypass_cache(self):
+        """Вошедшим пользователям страница не кэшируется и не отдаётся."""
+        url = self.url("index")
+        self.client.get(url)
+        self.client.force_login(self.reader)
+        response = self.client.get(url)
+        self.assertNotIn(page_cache.STATUS_HEADER, response)
+        self.assertIsNotNone(response.context)
+
+    def test_new_post_purges_only_its_pages(self):
+        """Новый пост сбрасывает ленту, свою группу и профиль автора."""
+        urls = {
+            "index": self.url("index"),
+            "group": self.url("group_posts", slug="group"),
+            "profile": self.url("profile", username="author"),
+            "other_group": self.url("group_posts", slug="other"),
+            "other_profile": self.url("profile", username="reader"),
+            "other_post": self.url("post_detail", post_id=self.other_post.id),
+        }
+        for url in urls.values():
+            self.client.get(url)
+        Post.objects.create(
+            author=self.author, group=self.group, text="Свежий пост"
+        )
+        expected = {
+            "index": "miss",
+            "group": "miss",
+            "profile": "miss",
+            "other_group": "hit",
+            "other_profile": "hit",
+            "other_post": "hit",
+        }
+        for name, url in urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(self.status(url), expected[name])
+        self.assertContains(self.client.get(urls["index"]), "Свежий пост")
+
+    def test_comment_purges_post_page(self):
+        """Комментарий сбрасывает только страницу своего поста."""
+        post_url = self.url("post_detail", post_id=self.post.id)
+        other_url = self.url("post_detail", post_id=self.other_post.id)
+        for url in (post_url, other_url, self.url("index")):
+            self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Новый комментарий"
+        )
+        self.assertEqual(self.status(other_url), "hit")
+        self.assertEqual(self.status(self.url("index")), "hit")
+        self.assertContains(self.client.get(post_url), "Новый комментарий")
+
+    def test_follow_purges_profile_counters(self):
+        """Подписка сбрасывает профили обоих пользователей, но не ленту."""
+        profile_url = self.url("profile", username="author")
+        urls = (
+            profile_url,
+            self.url("profile", username="reader"),
+            self.url("index"),
+        )
+        for url in urls:
+            self.client.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            [self.status(url) for url in urls], ["miss", "miss", "hit"]
+        )
+        self.assertContains(self.client.get(profile_url), "Подписчиков: 1")
+
+    def test_responses_with_csrf_or_cookies_are_not_stored(self):
+        """Ответ с CSRF-токеном или куками не попадает в кэш."""
+        factory = RequestFactory()
+        request = factory.get("/")
+        request.surrogate_keys = {"posts": "token"}
+        request.META["CSRF_COOKIE_USED"] = True
+        self.assertFalse(page_cache.store_response(request, HttpResponse()))
+        request = factory.get("/")
+        request.surrogate_keys = {"posts": "token"}
+        response = HttpResponse()
+        response.set_cookie("name", "value")
+        self.assertFalse(page_cache.store_response(request, response))
+        self.assertIsNone(page_cache.get_cached_response(request))
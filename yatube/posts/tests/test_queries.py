@@ -0,0 +1,175 @@
+import shutil
+import tempfile
+from contextlib import ExitStack
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.query_budget import count_queries
+from posts import thumbnails, views
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+NUMBER_OF_POSTS = 10
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+    """Каждая страница укладывается в объявленный бюджет запросов.
+
+    Бюджет рассчитан на холодный кэш: страницы проверяются сразу после
+    его очистки. Миниатюры картинок уже построены, как после задачи
+    обработки загруженной картинки, и их kvstore живёт в своём кэше.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        cls.author = User.objects.create_user(username="auth")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(NUMBER_OF_POSTS):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f"Тестовый пост {i}",
+                group=cls.group,
+                image=SimpleUploadedFile(
+                    name=f"small{i}.gif",
+                    content=small_gif,
+                    content_type="image/gif",
+                ),
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text="Комментарий"
+            )
+        for i in range(NUMBER_OF_POSTS):
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f"Комментарий {i}"
+            )
+        caches[settings.THUMBNAIL_CACHE].clear()
+        thumbnails.generate_many(
+            Post.objects.values_list("image", flat=True)
+        )
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_pages_fit_query_budget(self):
+        """GET-страницы из posts/urls.py не выходят за бюджет запросов."""
+        post_id = self.post.id
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:profile", kwargs={"username": "auth"}),
+            reverse("posts:post_detail", kwargs={"post_id": post_id}),
+            reverse("posts:post_comments", kwargs={"post_id": post_id}),
+            reverse("posts:post_create"),
+            reverse("posts:post_edit", kwargs={"post_id": post_id}),
+            reverse("posts:follow_index"),
+            reverse("posts:trending"),
+            reverse("posts:group_trending", kwargs={"slug": "test_slug"}),
+            reverse("posts:search") + "?q=Тестовый&group=test_slug",
+            reverse("posts:api_index"),
+            reverse("posts:api_group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:api_profile_posts", kwargs={"username": "auth"}),
+            reverse("posts:api_post_detail", kwargs={"post_id": post_id}),
+            reverse("posts:api_post_comments", kwargs={"post_id": post_id}),
+        )
+        for client in (self.reader_client, Client()):
+            for url in urls:
+                with self.subTest(url=url, client=client):
+                    cache.clear()
+                    response = client.get(url)
+                    self.assertIn(response.status_code, (200, 302))
+
+    def test_write_views_fit_query_budget(self):
+        """Изменяющие представления не выходят за бюджет запросов."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        responses = (
+            author_client.post(
+                reverse("posts:post_edit", kwargs={"post_id": self.post.id}),
+                {"text": "Измененный пост", "group": self.group.id},
+            ),
+            self.reader_client.post(
+                reverse("posts:add_comment", kwargs={"post_id": self.post.id}),
+                {"text": "Новый комментарий"},
+            ),
+            self.reader_client.post(
+                reverse("posts:post_create"), {"text": "Новый пост"}
+            ),
+            self.reader_client.get(
+                reverse("posts:profile_unfollow", kwargs={"username": "auth"})
+            ),
+            self.reader_client.get(
+                reverse("posts:profile_follow", kwargs={"username": "auth"})
+            ),
+        )
+        for response in responses:
+            with self.subTest(response=response):
+                self.assertEqual(response.status_code, 302)
+
+    def count_page_queries(self, url, page_size):
+        """Запросы страницы с page_size постами на холодном кэше."""
+        cache.clear()
+        with ExitStack() as stack:
+            stack.enter_context(
+                mock.patch.object(views, "NUM_OF_ENTRIES", page_size)
+            )
+            for view in (
+                views.HomePageView,
+                views.GroupPageView,
+                views.ProfilePageView,
+                views.TrendingView,
+            ):
+                stack.enter_context(
+                    mock.patch.object(view, "paginate_by", page_size)
+                )
+            with count_queries() as counter:
+                response = self.reader_client.get(url)
+        self.assertEqual(len(response.context["page_obj"]), page_size)
+        return counter.count
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        """Число запросов страницы не зависит от числа постов на ней."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:profile", kwargs={"username": "auth"}),
+            reverse("posts:follow_index"),
+            reverse("posts:trending"),
+            reverse("posts:search") + "?q=Тестовый",
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.count_page_queries(url, 2),
+                    self.count_page_queries(url, NUMBER_OF_POSTS),
+                )
@@ -0,0 +1,128 @@
+import random
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts import recommendations
+from posts.models import Follow, Recommendation
+
+User = get_user_model()
+
+# Подписки (пользователь, автор): 1 читает 2 и 3, у 1 и 6 общий автор 2
+EDGES = [(1, 2), (1, 3), (2, 4), (3, 4), (3, 5), (6, 2), (6, 7)]
+
+
+class ComputeTests(SimpleTestCase):
+    def compute(self, edges, **kwargs):
+        users, authors = zip(*edges)
+        return dict(recommendations.compute(users, authors, **kwargs))
+
+    def test_friends_of_friends_and_cofollowers(self):
+        """Оценка складывается из друзей друзей и общих подписчиков."""
+        top = self.compute(EDGES)[1]
+        self.assertEqual(top, [(4, 2.0), (5, 1.0), (7, 0.5)])
+
+    def test_followed_and_self_are_excluded(self):
+        """Уже прочитанные авторы и сам пользователь не предлагаются."""
+        results = self.compute(EDGES + [(2, 1)])
+        self.assertNotIn(1, dict(results[1]))
+        self.assertNotIn(2, dict(results[6]))
+
+    def test_celebrities_do_not_make_users_similar(self):
+        """Подписчики популярного автора не считаются похожими."""
+        top = self.compute(EDGES, max_shared_followers=1)[1]
+        self.assertEqual(top, [(4, 2.0), (5, 1.0)])
+
+    def test_limit(self):
+        """Сохраняется не больше limit лучших авторов."""
+        self.assertEqual(self.compute(EDGES, limit=1)[1], [(4, 2.0)])
+
+    @skipUnless(recommendations.is_vectorized(), "нужны NumPy и SciPy")
+    def test_sparse_matches_python(self):
+        """Матричный расчёт совпадает с расчётом на словарях."""
+        generator = random.Random(1)
+        edges = sorted(
+            {
+                (generator.randint(1, 60), generator.randint(1, 60))
+                for _ in range(600)
+            }
+        )
+        edges = [(user, author) for user, author in edges if user != author]
+        users, authors = zip(*edges)
+        sparse = dict(
+            recommendations._compute_sparse(users, authors, 10, 7, 20)
+        )
+        python = dict(
+            recommendations._compute_python(users, authors, 10, 20)
+        )
+        self.assertEqual(sparse.keys(), python.keys())
+        for user_id, top in python.items():
+            expected = [score for _, score in top]
+            actual = [score for _, score in sparse[user_id]]
+            for left, right in zip(actual, expected):
+                self.assertAlmostEqual(left, right, places=4)
+            self.assertEqual(len(actual), len(expected))
+
+
+class RecommendationStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            number: User.objects.create_user(username=f"user{number}")
+            for number in range(1, 8)
+        }
+        for user, author in EDGES:
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        cache.clear()
+        call_command("update_recommendations", stdout=StringIO())
+        self.client = Client()
+        self.client.force_login(self.users[1])
+
+    def test_rebuild_stores_ranked_authors(self):
+        """Команда сохраняет авторов по местам."""
+        self.assertEqual(
+            recommendations.for_user(self.users[1]),
+            [self.users[4], self.users[5], self.users[7]],
+        )
+
+    def test_rebuild_drops_users_without_follows(self):
+        """Отписка ото всех удаляет рекомендации при пересчёте."""
+        Follow.objects.filter(user=self.users[1]).delete()
+        recommendations.rebuild()
+        self.assertFalse(
+            Recommendation.objects.filter(user=self.users[1]).exists()
+        )
+
+    def test_follow_removes_recommendation(self):
+        """Подписка убирает автора из рекомендаций сразу."""
+        self.client.get(
+            reverse("posts:profile_follow", kwargs={"username": "user4"})
+        )
+        self.assertEqual(
+            recommendations.for_user(self.users[1]),
+            [self.users[5], self.users[7]],
+        )
+
+    def test_follow_page_shows_recommendations(self):
+        """Лента подписок и свой профиль показывают рекомендации."""
+        for url in (
+            reverse("posts:follow_index"),
+            reverse("posts:profile", kwargs={"username": "user1"}),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(
+                response.context["recommended_authors"][0], self.users[4]
+            )
+            self.assertContains(
+                response,
+                reverse("posts:profile_follow", kwargs={"username": "user5"}),
+            )
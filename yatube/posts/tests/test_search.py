@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="auth")
+        cls.other = User.objects.create_user(username="other")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        cls.cats = Post.objects.create(
+            author=cls.author, text="Коты и кошки", group=cls.group
+        )
+        cls.dogs = Post.objects.create(author=cls.other, text="Собаки")
+        cls.client = Client()
+
+    def search(self, **params):
+        response = self.client.get(reverse("posts:search"), params)
+        return list(response.context["page_obj"])
+
+    def test_search_finds_posts_by_words(self):
+        """Поиск находит посты по словам и префиксам."""
+        self.assertEqual(self.search(q="коты"), [self.cats])
+        self.assertEqual(self.search(q="соба"), [self.dogs])
+        self.assertEqual(self.search(q="коты собаки"), [])
+
+    def test_search_ignores_query_syntax(self):
+        """Операторы FTS5 во вводе не ломают запрос."""
+        self.assertEqual(self.search(q='"коты*('), [self.cats])
+
+    def test_search_filters_by_group_and_author(self):
+        """Результаты фильтруются по группе и автору."""
+        Post.objects.create(author=self.other, text="Коты соседа")
+        self.assertEqual(self.search(q="коты", group="test_slug"), [self.cats])
+        self.assertEqual(len(self.search(q="коты", author="other")), 1)
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.get(id=self.dogs.id)
+        post.text = "Попугаи"
+        post.save()
+        self.assertEqual(self.search(q="собаки"), [])
+        self.assertEqual(self.search(q="попугаи"), [self.dogs])
+        Post.objects.filter(id=self.dogs.id).delete()
+        self.assertEqual(self.search(q="попугаи"), [])
+
+    def test_results_are_paginated_by_cursor(self):
+        """Результаты поиска разбиваются на страницы курсором."""
+        for i in range(12):
+            Post.objects.create(author=self.author, text=f"Коты {i}")
+        response = self.client.get(reverse("posts:search"), {"q": "коты"})
+        first = response.context["page_obj"]
+        second = self.client.get(
+            reverse("posts:search") + "?" + first.next_querystring
+        ).context["page_obj"]
+        ids = {post.id for post in list(first) + list(second)}
+        self.assertEqual(len(ids), 13)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+        search.clear_index()
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(search.matching_ids("коты", 10), [self.cats.id])
@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.models import Task
+from core.tasks import run_pending
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text="Тестовый пост",
+            image=SimpleUploadedFile(
+                name="small.gif", content=SMALL_GIF, content_type="image/gif"
+            ),
+        )
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        caches[settings.THUMBNAIL_CACHE].clear()
+
+    def test_warm_command_builds_thumbnails(self):
+        """Команда warm_thumbnails строит миниатюры всех картинок."""
+        source = ImageFile(self.post.image.name)
+        self.assertIsNone(default.kvstore.get(source))
+        call_command("warm_thumbnails", workers=1, stdout=StringIO())
+        self.assertIsNotNone(default.kvstore.get(source))
+
+    def test_upload_schedules_thumbnails(self):
+        """Загрузка картинки ставит её обработку в очередь задач."""
+        self.author_client.post(
+            reverse("posts:post_create"),
+            {
+                "text": "Пост с картинкой",
+                "image": SimpleUploadedFile(
+                    name="new.gif", content=SMALL_GIF, content_type="image/gif"
+                ),
+            },
+        )
+        post = Post.objects.get(text="Пост с картинкой")
+        self.assertTrue(
+            Task.objects.filter(key=f"image:{post.image.name}").exists()
+        )
+        run_pending()
+        post.refresh_from_db()
+        self.assertIsNotNone(default.kvstore.get(ImageFile(post.image.name)))
+
+    # Построение миниатюры в запросе выходит за бюджет запросов страницы:
+    # в продакшене это предупреждение в логе, а не ошибка
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_page_builds_missing_thumbnail(self):
+        """Страница строит миниатюру, которую не успела построить задача."""
+        response = Client().get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.id})
+        )
+        self.assertNotContains(response, self.post.image.url)
+        self.assertIsNotNone(
+            default.kvstore.get(ImageFile(self.post.image.name))
+        )
+
+    def test_image_size_comes_from_database(self):
+        """Размеры картинки на странице берутся из полей поста."""
+        thumbnails.generate_many([self.post.image.name])
+        Post.objects.filter(id=self.post.id).update(
+            image_width=640, image_height=480
+        )
+        response = Client().get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.id})
+        )
+        self.assertContains(response, 'width="640" height="480"')
@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="auth")
+        cls.follower = User.objects.create_user(username="follower")
+        cls.old_post = Post.objects.create(
+            author=cls.author, text="Старый пост"
+        )
+        cls.follower_client = Client()
+        cls.follower_client.force_login(cls.follower)
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Подписка заполняет ленту, отписка очищает её."""
+        self.follower_client.get(
+            reverse("posts:profile_follow", kwargs={"username": "auth"})
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.follower, post=self.old_post
+            ).exists()
+        )
+        self.follower_client.get(
+            reverse("posts:profile_unfollow", kwargs={"username": "auth"})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+
+    def test_new_post_is_fanned_out(self):
+        """Новый пост попадает в ленту подписчика при публикации."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый пост")
+        response = self.follower_client.get(reverse("posts:follow_index"))
+        self.assertEqual(response.context["page_obj"][0], post)
+        self.assertEqual(len(response.context["page_obj"]), 2)
+
+    def test_celebrity_posts_merged_on_read(self):
+        """Посты «знаменитостей» не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        with mock.patch.object(timeline, "FANOUT_LIMIT", 0):
+            post = Post.objects.create(author=self.author, text="Новый пост")
+            self.assertFalse(
+                TimelineEntry.objects.filter(post=post).exists()
+            )
+            posts = list(timeline.get_timeline(self.follower))
+        self.assertEqual(posts, [post, self.old_post])
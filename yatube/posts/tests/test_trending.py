@@ -0,0 +1,140 @@
+import math
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Group, Post, TrendingScore
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа", slug="other", description="Описание"
+        )
+        cls.quiet = Post.objects.create(author=cls.author, text="Тихий пост")
+        cls.busy = Post.objects.create(
+            author=cls.author, group=cls.group, text="Обсуждаемый пост"
+        )
+        cls.old = Post.objects.create(
+            author=cls.author, group=cls.group, text="Старое обсуждение"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def comment(self, post):
+        self.authorized_client.post(
+            reverse("posts:add_comment", kwargs={"post_id": post.id}),
+            {"text": "Комментарий"},
+        )
+
+    def test_comments_update_score_incrementally(self):
+        """Каждый комментарий увеличивает оценку поста на свой вес."""
+        self.comment(self.busy)
+        self.assertAlmostEqual(
+            trending.weight(TrendingScore.objects.get(post=self.busy).score),
+            1,
+            places=3,
+        )
+        self.comment(self.busy)
+        score = TrendingScore.objects.get(post=self.busy)
+        self.assertEqual(score.group_id, self.group.id)
+        self.assertAlmostEqual(trending.weight(score.score), 2, places=3)
+
+    def test_old_comments_decay(self):
+        """Вес комментария уменьшается вдвое за HALF_LIFE."""
+        now = timezone.now()
+        earlier = now - timedelta(seconds=trending.HALF_LIFE)
+        old = Comment.objects.create(
+            post=self.old, author=self.author, text="Давно"
+        )
+        Comment.objects.filter(id=old.id).update(pub_date=earlier)
+        call_command("update_trending", "--rebuild", stdout=StringIO())
+        score = TrendingScore.objects.get(post=self.old).score
+        self.assertAlmostEqual(trending.weight(score, now), 0.5, places=3)
+
+    def test_rebuild_matches_incremental_scores(self):
+        """Пересчёт с нуля даёт те же оценки, что и обновления."""
+        for post in (self.busy, self.busy, self.quiet):
+            self.comment(post)
+        incremental = dict(
+            TrendingScore.objects.values_list("post_id", "score")
+        )
+        trending.rebuild()
+        rebuilt = dict(TrendingScore.objects.values_list("post_id", "score"))
+        self.assertEqual(incremental.keys(), rebuilt.keys())
+        for post_id, score in incremental.items():
+            self.assertTrue(math.isclose(score, rebuilt[post_id]))
+
+    def test_prune_removes_faded_scores(self):
+        """Затухшие оценки удаляются."""
+        self.comment(self.busy)
+        later = timezone.now() + timedelta(seconds=trending.HALF_LIFE * 10)
+        self.assertEqual(trending.prune(later), 1)
+        self.assertFalse(TrendingScore.objects.exists())
+
+    def test_group_change_moves_score(self):
+        """Перенос поста в другую группу переносит и его оценку."""
+        self.comment(self.busy)
+        post = Post.objects.get(id=self.busy.id)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(
+            TrendingScore.objects.get(post=post).group_id,
+            self.other_group.id,
+        )
+
+    def test_trending_page_order(self):
+        """Страница тренда упорядочена по оценке, в том числе в группе."""
+        for post in (self.busy, self.busy, self.quiet):
+            self.comment(post)
+        response = self.client.get(reverse("posts:trending"))
+        self.assertEqual(
+            list(response.context["page_obj"]), [self.busy, self.quiet]
+        )
+        response = self.client.get(
+            reverse("posts:group_trending", kwargs={"slug": "test-slug"})
+        )
+        self.assertEqual(list(response.context["page_obj"]), [self.busy])
+        self.assertEqual(response.context["group"], self.group)
+
+    def test_trending_pagination(self):
+        """Курсор следующей страницы продолжает рейтинг."""
+        posts = [
+            Post.objects.create(author=self.author, text=f"Пост {number}")
+            for number in range(12)
+        ]
+        for post in posts:
+            self.comment(post)
+        url = reverse("posts:trending")
+        first = self.client.get(url).context["page_obj"]
+        second = self.client.get(
+            url, {"cursor": first.next_cursor}
+        ).context["page_obj"]
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+
+    def test_unknown_group_returns_404(self):
+        """Тренд несуществующей группы — 404."""
+        response = self.client.get(
+            reverse("posts:group_trending", kwargs={"slug": "missing"})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -3,13 +3,17 @@ import shutil
 import tempfile
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django import forms
 from django.conf import settings
 
 from posts.models import Post, Group, Comment, Follow
+from posts.paginators import encode_cursor
+from posts.views import COMMENTS_PER_PAGE
 
 User = get_user_model()
 
@@ -64,6 +68,10 @@ class PostPagesTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        # Откат транзакции теста не меняет поколений кэша
+        cache.clear()
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
@@ -170,7 +178,8 @@ class PostPagesTests(TestCase):
         """Кэш страницы index работает правильно"""
         response = self.authorized_client.get(reverse("posts:index"))
         content = response.content
-        Post.objects.get(id=1).delete()
+        # update() не шлёт сигналов: поколение не меняется, страница из кэша
+        Post.objects.filter(id=self.post.id).update(text="Изменённый пост")
         response = self.authorized_client.get(reverse("posts:index"))
         content_1 = response.content
         cache.clear()
@@ -179,6 +188,44 @@ class PostPagesTests(TestCase):
         self.assertEqual(content, content_1)
         self.assertNotEqual(content, content_cache_clear)
 
+    def test_cache_invalidated_on_post_change(self):
+        """Изменение и удаление поста сразу сбрасывают кэш страниц"""
+        post = Post.objects.create(
+            author=self.user_author, group=self.group, text="Свежий пост"
+        )
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:profile", kwargs={"username": "auth"}),
+        )
+        for url in urls:
+            self.assertContains(self.authorized_client.get(url), "Свежий пост")
+        post.text = "Отредактированный пост"
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "Отредактированный пост")
+        Post.objects.get(id=post.id).delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, "Отредактированный пост")
+
+    def test_group_slug_change_refreshes_profile_links(self):
+        """Смена адреса группы сразу меняет ссылки в профиле автора"""
+        url = reverse("posts:profile", kwargs={"username": "auth"})
+        clients = (self.authorized_client, Client())
+        for client in clients:
+            client.get(url)
+        group = Group.objects.get(id=self.group.id)
+        group.slug = "new_slug"
+        group.save()
+        new_link = reverse("posts:group_posts", kwargs={"slug": "new_slug"})
+        for client in clients:
+            with self.subTest(client=client):
+                self.assertContains(client.get(url), new_link)
+
     def test_user_can_follow_and_unfollow_author(self):
         """Авторизированный пользователь может подписаться на автора
         и удалить из подписок"""
@@ -253,3 +300,114 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(response_posts.context["page_obj"]), 2)
         self.assertEqual(len(response_group_list.context["page_obj"]), 2)
         self.assertEqual(len(response_profile.context["page_obj"]), 2)
+
+    def test_cursor_pages_cover_all_records(self):
+        # Проверка: курсорные страницы отдают все посты без повторов.
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test_slug"}),
+            reverse("posts:profile", kwargs={"username": "auth"}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.author_client.get(url).context["page_obj"]
+                self.assertTrue(first.has_next())
+                second = self.author_client.get(
+                    url + "?" + first.next_querystring
+                ).context["page_obj"]
+                self.assertEqual(len(second), 2)
+                self.assertFalse(second.has_next())
+                ids = [post.id for post in list(first) + list(second)]
+                self.assertEqual(len(set(ids)), 12)
+                back = self.author_client.get(
+                    url + "?" + second.previous_querystring
+                ).context["page_obj"]
+                self.assertEqual(list(back), list(first))
+
+    def test_cursor_page_is_stable_when_new_post_arrives(self):
+        # Проверка: новый пост не сдвигает следующую страницу.
+        first = self.author_client.get(reverse("posts:index")).context[
+            "page_obj"
+        ]
+        Post.objects.create(author=self.user, text="Свежий пост")
+        second = self.author_client.get(
+            reverse("posts:index") + "?" + first.next_querystring
+        ).context["page_obj"]
+        self.assertEqual(len(second), 2)
+
+    def test_malformed_cursor_shows_first_page(self):
+        # Проверка: курсор со значениями не тех типов даёт первую страницу.
+        first = self.author_client.get(reverse("posts:index")).context[
+            "page_obj"
+        ]
+        date = {"dt": "2020-01-01T00:00:00+00:00"}
+        cursors = (
+            encode_cursor("n", ["вчера", 1]),
+            encode_cursor("n", [date, "много"]),
+            encode_cursor("n", [1, date]),
+            encode_cursor("n", [{"dt": 1}, 1]),
+            encode_cursor("n", [date, [1]]),
+            encode_cursor("n", "ab"),
+            "WyJuIiwgW05hTiwgMV1d",  # ["n", [NaN, 1]]
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.author_client.get(
+                    reverse("posts:index"), {"cursor": cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    list(response.context["page_obj"]), list(first)
+                )
+
+
+class CommentsPaginationTests(TestCase):
+    NUMBER_OF_COMMENTS = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="auth")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый пост")
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f"Комментарий {i}")
+            for i in range(cls.NUMBER_OF_COMMENTS)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_page_of_comments(self):
+        """На странице поста первая страница комментариев и одна выборка
+        поста."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, "Комментарий 0")
+        self.assertTrue(comments.has_next())
+        # Кроме лёгкого запроса автора и группы для суррогатных ключей
+        post_queries = [
+            query
+            for query in queries.captured_queries
+            if 'FROM "posts_post"' in query["sql"]
+            and '"posts_post"."text"' in query["sql"]
+        ]
+        self.assertEqual(len(post_queries), 1)
+
+    def test_fragment_loads_next_comments(self):
+        """Фрагмент отдаёт оставшиеся комментарии по курсору."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.id})
+        first = self.client.get(url).context["comments"]
+        response = self.client.get(
+            reverse("posts:post_comments", kwargs={"post_id": self.post.id})
+            + "?"
+            + first.next_querystring
+        )
+        self.assertTemplateUsed(response, "posts/includes/comments.html")
+        rest = response.context["comments"]
+        self.assertEqual(
+            len(rest), self.NUMBER_OF_COMMENTS - COMMENTS_PER_PAGE
+        )
+        self.assertFalse(rest.has_next())
+        self.assertContains(response, f"Комментарий {len(first)}")
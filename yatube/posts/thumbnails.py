@@ -0,0 +1,45 @@
+"""Предварительная генерация миниатюр картинок постов.
+
+Тег {% thumbnail %} создаёт миниатюру при первом показе, и её
+декодирование и масштабирование оплачивает первый посетитель. Здесь
+все размеры из POST_THUMBNAIL_GEOMETRIES строятся заранее: задачей
+posts.tasks.process_image после загрузки картинки и командой
+warm_thumbnails для уже загруженных картинок.
+"""
+import logging
+
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# Должны совпадать с параметрами тега {% thumbnail %} в шаблонах
+GEOMETRIES = getattr(settings, "POST_THUMBNAIL_GEOMETRIES", [("960", {})])
+
+
+def generate(image_name):
+    """Строит все миниатюры картинки (уже готовые берутся из kvstore)."""
+    for geometry, options in GEOMETRIES:
+        get_thumbnail(image_name, geometry, **options)
+
+
+def generate_many(image_names):
+    done = 0
+    for image_name in image_names:
+        try:
+            generate(image_name)
+            done += 1
+        except Exception:
+            logger.exception("Не удалось построить миниатюры %s", image_name)
+    return done
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, учитывающий время в метриках запроса."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with timed("thumbnail"):
+            return super().get_thumbnail(file_, geometry_string, **options)
@@ -0,0 +1,131 @@
+"""Материализованная лента подписок.
+
+Пост раскладывается по лентам подписчиков в момент публикации, поэтому
+страница follow_index читает готовый диапазон строк TimelineEntry.
+Для авторов с очень большим числом подписчиков раскладка не делается:
+их посты подмешиваются в ленту при чтении (гибридный режим).
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+FANOUT_LIMIT = getattr(settings, "TIMELINE_FANOUT_LIMIT", 10000)
+BACKFILL_LIMIT = getattr(settings, "TIMELINE_BACKFILL_LIMIT", 500)
+
+# Ключ сортировки ленты для keyset-пагинации
+FEED_ORDERING = ("-feed_date", "-feed_post")
+
+
+def celebrity_ids(user):
+    """id авторов-«знаменитостей» среди подписок пользователя."""
+    return Follow.objects.filter(
+        user=user, author__stats__followers_count__gt=FANOUT_LIMIT
+    ).values_list("author_id", flat=True)
+
+
+def _tables():
+    return {
+        "entries": TimelineEntry._meta.db_table,
+        "follows": Follow._meta.db_table,
+        "posts": Post._meta.db_table,
+        "stats": UserStats._meta.db_table,
+    }
+
+
+# Строки ленты вставляются одним INSERT ... SELECT, без выборки id в
+# Python; NOT EXISTS пропускает авторов-«знаменитостей»
+FAN_OUT = """
+    INSERT INTO {entries} (user_id, post_id, author_id, pub_date)
+    SELECT f.user_id, p.id, p.author_id, p.pub_date
+    FROM {posts} p
+    JOIN {follows} f ON f.author_id = p.author_id
+    WHERE p.id = %s AND NOT EXISTS (
+        SELECT 1 FROM {stats} s
+        WHERE s.user_id = p.author_id AND s.followers_count > %s
+    )
+    ON CONFLICT DO NOTHING
+"""
+BACKFILL = """
+    INSERT INTO {entries} (user_id, post_id, author_id, pub_date)
+    SELECT %s, id, author_id, pub_date FROM (
+        SELECT id, author_id, pub_date FROM {posts}
+        WHERE author_id = %s
+        ORDER BY pub_date DESC, id DESC
+        LIMIT %s
+    )
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {stats} s
+        WHERE s.user_id = %s AND s.followers_count > %s
+    )
+    ON CONFLICT DO NOTHING
+"""
+
+
+def _execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(**_tables()), params)
+        return cursor.rowcount
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    _execute(FAN_OUT, [post.id, FANOUT_LIMIT])
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту последними постами автора после подписки."""
+    _execute(
+        BACKFILL,
+        [user_id, author_id, BACKFILL_LIMIT, author_id, FANOUT_LIMIT],
+    )
+
+
+def rebuild_from_follows():
+    """Заполняет ленты по всем подпискам одним INSERT ... SELECT.
+
+    Нужна после массовой загрузки постов и подписок в обход сигналов:
+    построчный backfill() на миллионах подписок слишком медленный.
+    """
+    sql = """
+        INSERT INTO {entries} (user_id, post_id, author_id, pub_date)
+        SELECT f.user_id, p.id, p.author_id, p.pub_date
+        FROM {follows} f
+        JOIN {stats} s
+            ON s.user_id = f.author_id AND s.followers_count <= %s
+        JOIN (
+            SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+                PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+            ) AS position
+            FROM {posts}
+        ) p ON p.author_id = f.author_id AND p.position <= %s
+        WHERE true
+        ON CONFLICT DO NOTHING
+    """
+    return _execute(sql, [FANOUT_LIMIT, BACKFILL_LIMIT])
+
+
+def trim(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_timeline(user):
+    """Посты ленты подписок пользователя в обратном хронологическом порядке.
+
+    Без подписок на «знаменитостей» это один диапазон по индексу ленты;
+    иначе к материализованной части подмешиваются их посты.
+    """
+    celebrities = list(celebrity_ids(user))
+    if not celebrities:
+        posts = Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F("timeline_entries__pub_date"),
+            feed_post=F("timeline_entries__post"),
+        )
+    else:
+        entries = TimelineEntry.objects.filter(user=user).values("post_id")
+        posts = Post.objects.filter(
+            Q(id__in=entries) | Q(author_id__in=celebrities)
+        ).annotate(feed_date=F("pub_date"), feed_post=F("id"))
+    return posts.select_related("author", "group").order_by(*FEED_ORDERING)
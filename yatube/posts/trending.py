@@ -0,0 +1,126 @@
+"""Посты «в тренде»: скорость комментирования с затуханием во времени.
+
+Комментарий, оставленный в момент t, к моменту now весит
+2 ** (-(now - t) / HALF_LIFE). Вес поста — сумма весов его комментариев,
+то есть exp(-now / SCALE) * Σ exp(t / SCALE). Первый множитель общий для
+всех постов и порядок не меняет, поэтому в TrendingScore.score хранится
+только log Σ exp(t / SCALE). Новый комментарий меняет одну строку одним
+UPDATE, старые оценки не пересчитываются, а страница тренда читает
+диапазон индекса (score) или (group, score) без обхода комментариев.
+
+Удаление комментария оценку не уменьшает: его вклад и так затухает.
+Строки, вес которых упал ниже PRUNE_BELOW, удаляет команда
+update_trending (её стоит запускать по расписанию).
+"""
+import itertools
+import math
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Comment, Post, TrendingScore
+
+HALF_LIFE = getattr(settings, "TRENDING_HALF_LIFE", 6 * 60 * 60)
+PRUNE_BELOW = getattr(settings, "TRENDING_PRUNE_BELOW", 0.01)
+BATCH_SIZE = 1000
+
+SCALE = HALF_LIFE / math.log(2)
+
+# Ключ сортировки тренда для keyset-пагинации
+TRENDING_ORDERING = ("-trend_score", "-trend_post")
+
+
+def point(moment):
+    """Логарифм веса комментария, оставленного в момент moment."""
+    return moment.timestamp() / SCALE
+
+
+def weight(score, now=None):
+    """Вес поста к моменту now: сколько «свежих» комментариев он стоит."""
+    return math.exp(score - point(now or timezone.now()))
+
+
+def _log_add(score, value):
+    """log(exp(score) + exp(value)) без переполнения, выражением SQL."""
+    value = Value(value, output_field=FloatField())
+    return Greatest(score, value) + Ln(1 + Exp(-Abs(score - value)))
+
+
+def record_comment(comment):
+    """Учитывает новый комментарий в оценке его поста."""
+    value = point(comment.pub_date)
+    scores = TrendingScore.objects.filter(post_id=comment.post_id)
+    if scores.update(score=_log_add(F("score"), value)):
+        return
+    try:
+        # Первый комментарий поста; пост обычно уже загружен представлением
+        with transaction.atomic():
+            TrendingScore.objects.create(
+                post_id=comment.post_id,
+                group_id=comment.post.group_id,
+                score=value,
+            )
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        scores.update(score=_log_add(F("score"), value))
+
+
+def move_post(post):
+    """Переносит оценку поста в его новую группу."""
+    TrendingScore.objects.filter(post_id=post.id).update(
+        group_id=post.group_id
+    )
+
+
+def get_trending(group=None):
+    """Посты в порядке убывания оценки; сортировать по TRENDING_ORDERING."""
+    posts = Post.objects.filter(trending__isnull=False)
+    if group is not None:
+        posts = posts.filter(trending__group_id=group.id)
+    return posts.annotate(
+        trend_score=F("trending__score"), trend_post=F("trending__post")
+    ).select_related("group")
+
+
+def prune(now=None):
+    """Удаляет оценки, вес которых упал ниже PRUNE_BELOW."""
+    threshold = point(now or timezone.now()) + math.log(PRUNE_BELOW)
+    deleted, _ = TrendingScore.objects.filter(score__lt=threshold).delete()
+    return deleted
+
+
+def rebuild():
+    """Пересчитывает оценки по всем комментариям (после bulk_create)."""
+    TrendingScore.objects.all().delete()
+    rows = (
+        Comment.objects.order_by("post_id")
+        .values_list("post_id", "post__group_id", "pub_date")
+        .iterator()
+    )
+    scores = (
+        TrendingScore(
+            post_id=post_id,
+            group_id=group_id,
+            score=_log_sum_exp(point(pub_date) for *_, pub_date in comments),
+        )
+        for (post_id, group_id), comments in itertools.groupby(
+            rows, key=lambda row: row[:2]
+        )
+    )
+    created = 0
+    while True:
+        batch = list(itertools.islice(scores, BATCH_SIZE))
+        if not batch:
+            break
+        TrendingScore.objects.bulk_create(batch)
+        created += len(batch)
+    return created - prune()
+
+
+def _log_sum_exp(values):
+    values = list(values)
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = "posts"
 
@@ -9,6 +9,12 @@ urlpatterns = [
     path(
         "group/<slug:slug>/", views.GroupPageView.as_view(), name="group_posts"
     ),
+    path("trending/", views.TrendingView.as_view(), name="trending"),
+    path(
+        "group/<slug:slug>/trending/",
+        views.TrendingView.as_view(),
+        name="group_trending",
+    ),
     path(
         "profile/<str:username>/",
         views.ProfilePageView.as_view(),
@@ -25,10 +31,16 @@ urlpatterns = [
         views.PostUpdateView.as_view(),
         name="post_edit",
     ),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path(
         "posts/<int:post_id>/comment/", views.add_comment, name="add_comment"
     ),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
     path(
         "profile/<str:username>/follow/",
         views.profile_follow,
@@ -39,4 +51,23 @@ urlpatterns = [
         views.profile_unfollow,
         name="profile_unfollow",
     ),
+    path("api/posts/", api.index, name="api_index"),
+    path(
+        "api/group/<slug:slug>/posts/",
+        api.group_posts,
+        name="api_group_posts",
+    ),
+    path(
+        "api/profile/<str:username>/posts/",
+        api.profile_posts,
+        name="api_profile_posts",
+    ),
+    path(
+        "api/posts/<int:post_id>/", api.post_detail, name="api_post_detail"
+    ),
+    path(
+        "api/posts/<int:post_id>/comments/",
+        api.post_comments,
+        name="api_post_comments",
+    ),
 ]
@@ -1,50 +1,204 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import redirect, render, get_object_or_404
+from django.utils import timezone
 
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
-from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from core.db_router import reads_from_replica, replica_reads
+from core.generations import get_version
+from core.page_cache import add_surrogate_keys
+from core.query_budget import query_budget
+from .follows import follow_state_key, followed_author_ids, is_following
+from .forms import PostForm, CommentForm, SearchForm
+from .models import Post, Follow
+from .objects import attach_authors, get_group_or_404, get_user_or_404
+from .paginators import (
+    COMMENT_ORDERING,
+    CURSOR_PARAM,
+    CursorPaginationMixin,
+    CursorPaginator,
+    get_page,
+)
+from .scopes import (
+    ALL_POSTS,
+    group_scope,
+    post_scope,
+    profile_scope,
+    stats_scope,
+)
+from .search import SearchPaginator
+from . import recommendations, tasks, trending
+from .timeline import FEED_ORDERING, get_timeline
 
 NUM_OF_ENTRIES = 10
+COMMENTS_PER_PAGE = 20
 
 
-class HomePageView(ListView):
+def get_comments_page(request, post):
+    """Страница комментариев поста от старых к новым по курсору."""
+    paginator = CursorPaginator(
+        post.comments.select_related("author"),
+        COMMENTS_PER_PAGE,
+        COMMENT_ORDERING,
+    )
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+
+class FragmentCacheMixin:
+    """Версия кэша фрагментов страницы по поколениям её областей.
+
+    Те же области (и get_surrogate_keys() сверх них) служат суррогатными
+    ключами страницы в кэше для анонимных посетителей.
+    """
+
+    page_cache = True
+
+    def get_cache_scopes(self):
+        return [ALL_POSTS]
+
+    def get_surrogate_keys(self):
+        return self.get_cache_scopes()
+
+    def get_context_data(self, **kwargs):
+        # До выборки постов: см. core.page_cache.add_surrogate_keys
+        add_surrogate_keys(self.request, *self.get_surrogate_keys())
+        context = super().get_context_data(**kwargs)
+        context["cache_version"] = get_version(*self.get_cache_scopes())
+        timeout = settings.FRAGMENT_CACHE_TIMEOUT
+        if reads_from_replica():
+            # Поколение уже новое, а реплика могла ещё не получить запись:
+            # устаревший фрагмент не должен пережить отставание реплики
+            timeout = min(timeout, settings.REPLICA_LAG_SECONDS)
+        context["cache_timeout"] = timeout
+        return context
+
+
+class CachedAuthorsMixin:
+    """Авторы постов страницы из кэша объектов вместо JOIN."""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        attach_authors(context["page_obj"])
+        return context
+
+
+class FollowStateMixin:
+    """Подписки текущего пользователя на авторов постов страницы."""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        user = self.request.user
+        author_ids = {post.author_id for post in context["page_obj"]}
+        followed_ids = followed_author_ids(user, author_ids)
+        context["followed_ids"] = followed_ids
+        context["follow_key"] = follow_state_key(
+            user, author_ids, followed_ids
+        )
+        return context
+
+
+class HomePageView(
+    CachedAuthorsMixin,
+    FollowStateMixin,
+    FragmentCacheMixin,
+    CursorPaginationMixin,
+    ListView,
+):
     template_name = "posts/index.html"
     paginate_by = NUM_OF_ENTRIES
+    replica_reads = True
+    # Сессия, пользователь, посты, подписки на их авторов и авторы,
+    # которых нет в кэше объектов
+    query_budget = 5
 
     def get_queryset(self):
-        return Post.objects.all()
+        return Post.objects.select_related("group")
 
 
-class GroupPageView(ListView):
+class GroupPageView(
+    CachedAuthorsMixin,
+    FollowStateMixin,
+    FragmentCacheMixin,
+    CursorPaginationMixin,
+    ListView,
+):
     template_name = "posts/group_list.html"
     paginate_by = NUM_OF_ENTRIES
+    replica_reads = True
+    # Как у ленты и ещё группа при промахе кэша объектов
+    query_budget = 6
 
     def get_queryset(self, **kwargs):
-        group = get_object_or_404(Group, slug=self.kwargs["slug"])
-        return group.posts.all()
+        self.group = get_group_or_404(self.kwargs["slug"])
+        return self.group.posts.select_related("group")
+
+    def get_cache_scopes(self):
+        return [group_scope(self.group.id)]
 
 
-class ProfilePageView(ListView):
+class TrendingView(
+    CachedAuthorsMixin, FollowStateMixin, CursorPaginationMixin, ListView
+):
+    """Посты в тренде: всего сайта или группы, если задан slug.
+
+    Оценки меняются с каждым комментарием, поэтому фрагменты страницы
+    не кэшируются: она читает один диапазон индекса оценок.
+    """
+
+    template_name = "posts/trending.html"
+    paginate_by = NUM_OF_ENTRIES
+    cursor_ordering = trending.TRENDING_ORDERING
+    replica_reads = True
+    # Как у страницы группы: тренд группы тоже ищет её по адресу
+    query_budget = 6
+
+    def get_queryset(self):
+        self.group = None
+        if "slug" in self.kwargs:
+            self.group = get_group_or_404(self.kwargs["slug"])
+        return trending.get_trending(self.group).order_by(
+            *trending.TRENDING_ORDERING
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["group"] = self.group
+        now = timezone.now()
+        for post in context["page_obj"]:
+            post.trend_weight = trending.weight(post.trend_score, now)
+        return context
+
+
+class ProfilePageView(FragmentCacheMixin, CursorPaginationMixin, ListView):
     template_name = "posts/profile.html"
     paginate_by = NUM_OF_ENTRIES
+    replica_reads = True
+    # Сессия, пользователь, автор при промахе кэша объектов, посты,
+    # подписка на автора и его счётчики
+    query_budget = 6
 
     def get_queryset(self, **kwargs):
-        author = get_object_or_404(User, username=self.kwargs["username"])
-        return author.posts.all()
+        self.author = get_user_or_404(self.kwargs["username"])
+        return self.author.posts.select_related("group")
+
+    def get_cache_scopes(self):
+        return [profile_scope(self.author.id)]
+
+    def get_surrogate_keys(self):
+        return [profile_scope(self.author.id), stats_scope(self.author.id)]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        author = get_object_or_404(User, username=self.kwargs["username"])
-        context["posts"] = author.posts.all()
-        context["author"] = author
-        user = self.request.user
-        context["user"] = user
-        context["following"] = False
-        if user.id in author.following.values_list("user", flat=True):
-            context["following"] = True
+        context["author"] = self.author
+        for post in context["page_obj"]:
+            post.author = self.author
+        context["following"] = is_following(self.request.user, self.author)
+        if self.request.user.id == self.author.id:
+            context["recommended_authors"] = recommendations.for_user(
+                self.request.user
+            )
         return context
 
 
@@ -52,12 +206,36 @@ class PostDetailView(DetailView):
     model = Post
     pk_url_kwarg = "post_id"
     template_name = "posts/post_detail.html"
+    query_budget = 4
+    replica_reads = True
+    page_cache = True
+
+    def get_queryset(self):
+        return Post.objects.select_related("author__stats", "group")
+
+    def get_object(self, queryset=None):
+        post_id = self.kwargs["post_id"]
+        scopes = [post_scope(post_id)]
+        if getattr(self.request, "surrogate_keys", None) is not None:
+            # Поколения читаются до выборки поста (см. add_surrogate_keys),
+            # поэтому автора и группу узнаём отдельным лёгким запросом
+            keys = Post.objects.filter(id=post_id).values(
+                "author_id", "group_id"
+            )
+            for key in keys:
+                # Имя и счётчик постов автора, название группы
+                scopes += [
+                    profile_scope(key["author_id"]),
+                    stats_scope(key["author_id"]),
+                ]
+                if key["group_id"] is not None:
+                    scopes.append(group_scope(key["group_id"]))
+        add_surrogate_keys(self.request, *scopes)
+        return super().get_object(queryset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post = get_object_or_404(Post, id=self.kwargs["post_id"])
-        context["comments"] = post.comments.all()
-        context["post"] = post
+        context["comments"] = get_comments_page(self.request, self.object)
         context["form"] = CommentForm()
         return context
 
@@ -66,10 +244,13 @@ class PostCreateView(LoginRequiredMixin, CreateView):
     model = Post
     form_class = PostForm
     template_name = "posts/create_post.html"
+    query_budget = 10
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        post = form.save()
+        with transaction.atomic():
+            post = form.save()
+            tasks.schedule_image(post)
         return redirect("posts:profile", username=post.author.username)
 
     def get_context_data(self, **kwargs):
@@ -82,6 +263,7 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
     model = Post
     form_class = PostForm
     template_name = "posts/create_post.html"
+    query_budget = 9
 
     def get_object(self, queryset=None):
         return Post.objects.get(id=self.kwargs.get("post_id"))
@@ -93,10 +275,23 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         post = form.save()
+        if "image" in form.changed_data:
+            tasks.schedule_image(post)
         return redirect("posts:post_detail", post_id=post.id)
 
 
+@replica_reads
+@query_budget(4)
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев для подгрузки."""
+    post = get_object_or_404(Post.objects.only("id"), id=post_id)
+    context = {"post": post, "comments": get_comments_page(request, post)}
+    return render(request, "posts/includes/comments.html", context)
+
+
 @login_required
+@query_budget(11)
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -109,29 +304,53 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
+@query_budget(5)
 def follow_index(request):
-    user = request.user
-    authors = user.follower.values_list("author", flat=True)
-    posts = Post.objects.filter(author__in=authors)
+    posts = get_timeline(request.user)
     template = "posts/follow.html"
-    paginator = Paginator(posts, NUM_OF_ENTRIES)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    context = {"page_obj": page_obj}
+    page_obj = get_page(request, posts, NUM_OF_ENTRIES, FEED_ORDERING)
+    context = {
+        "page_obj": page_obj,
+        "recommended_authors": recommendations.for_user(request.user),
+    }
     return render(request, template, context)
 
 
 @login_required
+@query_budget(14)
+@transaction.atomic
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
+    author = get_user_or_404(username)
     user = request.user
-    follow = Follow.objects.filter(user=user, author=author)
-    if user != author and not follow.exists():
-        Follow.objects.create(user=user, author=author)
+    if user != author:
+        Follow.objects.get_or_create(user=user, author=author)
     return redirect("posts:profile", username=username)
 
 
 @login_required
+@query_budget(10)
+@transaction.atomic
 def profile_unfollow(request, username):
-    Follow.objects.get(user=request.user, author__username=username).delete()
+    author = get_user_or_404(username)
+    Follow.objects.get(user=request.user, author=author).delete()
     return redirect("posts:profile", username=username)
+
+
+@query_budget(6)
+def search(request):
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        group = form.cleaned_data["group"]
+        author = form.cleaned_data["author"]
+        paginator = SearchPaginator(
+            form.cleaned_data["q"],
+            NUM_OF_ENTRIES,
+            group_id=group.id if group else None,
+            author_id=author.id if author else None,
+        )
+        page_obj = paginator.get_page(request.GET.get(CURSOR_PARAM))
+        page_obj.params = request.GET.copy()
+    context = {"form": form, "page_obj": page_obj}
+    return render(request, "posts/search.html", context)
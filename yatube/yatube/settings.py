@@ -45,6 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ServerTimingMiddleware",
+    "core.middleware.QueryBudgetMiddleware",
+    "core.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,6 +55,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.PageCacheMiddleware",
 ]
 
 ROOT_URLCONF = "yatube.urls"
@@ -59,7 +63,7 @@ ROOT_URLCONF = "yatube.urls"
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.instrumentation.TimedDjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -84,9 +88,39 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Соединение переиспользуется между запросами потока
+        "CONN_MAX_AGE": 600,
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (см. core.sqlite)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,
+}
+
+# Реплики для чтения списков и постов (см. core.db_router). Локально
+# DB_REPLICAS=2 добавляет файлы db.replica1.sqlite3 и db.replica2.sqlite3,
+# которые обновляет команда sync_replicas.
+DATABASE_REPLICAS = [
+    f"replica{number}"
+    for number in range(1, int(os.environ.get("DB_REPLICAS", 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, f"db.{alias}.sqlite3"),
+        # Файл реплики подменяется целиком: держать его открытым нельзя
+        "CONN_MAX_AGE": 0,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+# Насколько реплики могут отставать: столько после записи клиент читает
+# с основной базы и столько живут фрагменты кэша, прочитанные с реплики.
+REPLICA_LAG_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -131,16 +165,105 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 LOGIN_URL = "users:login"
 LOGIN_REDIRECT_URL = "posts:index"
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Письма ставятся в очередь задач, воркер run_tasks отправляет их
+# бэкендом TASKS_EMAIL_BACKEND
+EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+TASKS_EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Отправку файлов из MEDIA_ROOT можно передать веб-серверу:
+# "x-accel-redirect" (nginx, location MEDIA_ACCEL_REDIRECT_PREFIX с alias
+# на MEDIA_ROOT и директивой internal) или "x-sendfile" (Apache).
+# None — файлы отдаёт Django через FileResponse.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
+# Кэш общий для всех процессов сервера (см. core.cache)
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+        "BACKEND": "core.cache.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 50000, "MAX_SIZE": 256 * 2 ** 20},
+    },
+    # Записи kvstore sorl-thumbnail: без них каждая картинка страницы
+    # стоит запроса к БД, поэтому они не вытесняются страницами и
+    # фрагментами и не сбрасываются вместе с основным кэшем
+    "thumbnails": {
+        "BACKEND": "core.cache.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache-thumbnails.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 200000, "MAX_SIZE": 64 * 2 ** 20},
+    },
 }
+
+# Лента подписок: авторы с большим числом подписчиков не раскладываются
+# по лентам при публикации, их посты подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL_LIMIT = 500
+
+# Превышение бюджета SQL-запросов представления: True — исключение
+# (для тестов), False — предупреждение в логе.
+QUERY_BUDGET_STRICT = False
+
+# Миниатюры картинок постов строятся заранее задачей обработки картинки;
+# размеры должны совпадать с тегом {% thumbnail %} в шаблонах.
+POST_THUMBNAIL_GEOMETRIES = [("960", {})]
+THUMBNAIL_PREGENERATE = True
+THUMBNAIL_BACKEND = "posts.thumbnails.TimedThumbnailBackend"
+THUMBNAIL_CACHE = "thumbnails"
+
+# Загруженные картинки постов уменьшаются до этого размера по большей
+# стороне и перекодируются (WebP, если Pillow его поддерживает).
+POST_IMAGE_MAX_SIZE = 2048
+POST_IMAGE_QUALITY = 82
+
+# Доля запросов с заголовком Server-Timing и строкой в логе core.timing
+SERVER_TIMING_SAMPLE_RATE = 0.01
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Фрагменты страниц инвалидируются сменой поколения (core.generations),
+# поэтому могут жить долго.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Страницы для анонимных посетителей (core.page_cache) сбрасываются по
+# суррогатным ключам; таймаут лишь ограничивает возраст записи
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Кэш групп и пользователей по адресу (posts.objects) сбрасывается
+# сигналами моделей; отсутствие объекта помнится недолго.
+OBJECT_CACHE_TIMEOUT = 60 * 60
+OBJECT_CACHE_NEGATIVE_TIMEOUT = 60
+
+# Тренд: вес комментария уменьшается вдвое за TRENDING_HALF_LIFE секунд,
+# оценки легче TRENDING_PRUNE_BELOW удаляет update_trending.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_PRUNE_BELOW = 0.01
+
+# Рекомендации «Кого почитать» (update_recommendations): сколько авторов
+# хранить и показывать, размер блока расчёта и порог популярности автора,
+# выше которого общие подписчики не считаются похожими.
+RECOMMENDATIONS_LIMIT = 20
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_CHUNK_SIZE = 2000
+RECOMMENDATIONS_MAX_SHARED_FOLLOWERS = 1000
+
+# Очередь фоновых задач (core.tasks): число процессов run_tasks и время,
+# после которого задачу упавшего воркера берёт другой.
+TASKS_WORKERS = 2
+TASKS_TIMEOUT = 10 * 60
@@ -0,0 +1,29 @@
+"""Настройки тестов: pytest (pytest.ini) и manage.py test.
+
+Кэш тестов лежит во временном каталоге, новом для каждого запуска:
+cache.clear() в тестах не трогает кэш сайта на той же машине, а записи
+прошлого запуска не попадают в следующий.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+CACHE_DIR = tempfile.mkdtemp(prefix="yatube-test-cache-")
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+
+CACHES = {
+    alias: {**config, "LOCATION": os.path.join(CACHE_DIR, alias + ".sqlite3")}
+    for alias, config in CACHES.items()
+}
+
+# Превышение бюджета SQL-запросов роняет любой тест, а не только
+# posts/tests/test_queries.py
+QUERY_BUDGET_STRICT = True
+
+# Замеры Server-Timing случайны и добавляют работы в запросе; тесты
+# выборки включают их сами через override_settings
+SERVER_TIMING_SAMPLE_RATE = 0